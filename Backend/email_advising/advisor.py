@@ -2,7 +2,8 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, List, Optional, Protocol
+from string import Formatter
+from typing import Dict, List, Mapping, Optional, Protocol, Tuple
 
 from .knowledge_base import KnowledgeBase
 from .composers import EmailComposer, TemplateEmailComposer
@@ -42,6 +43,70 @@ class _TemplateContext(dict):
             return value
 
 
+_MISSING = object()
+
+
+class _CompiledTemplate:
+    """Format string parsed once into literal text and placeholder segments.
+
+    Rendering simple ``{key}`` placeholders is a join over the segments.
+    Templates using format specs, conversions or attribute / index access
+    keep going through ``str.format_map`` so their output is unchanged.
+    """
+
+    __slots__ = ("source", "segments", "placeholders", "_needs_format_map")
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        segments: List[Tuple[str, Optional[str]]] = []
+        placeholders: set[str] = set()
+        needs_format_map = False
+        for literal, field_name, format_spec, conversion in Formatter().parse(source):
+            if field_name is None:
+                segments.append((literal, None))
+                continue
+            key = re.split(r"[.\[]", field_name, maxsplit=1)[0]
+            if format_spec or conversion or key != field_name or not key or key.isdigit():
+                needs_format_map = True
+            placeholders.add(key)
+            segments.append((literal, field_name))
+        self.segments = tuple(segments)
+        self.placeholders = frozenset(placeholders)
+        self._needs_format_map = needs_format_map
+
+    def render(self, values: Mapping[str, str]) -> str:
+        if self._needs_format_map:
+            return self.source.format_map(_TemplateContext(dict(values)))
+        parts: List[str] = []
+        for literal, key in self.segments:
+            parts.append(literal)
+            if key is not None:
+                value = values.get(key, _MISSING)
+                parts.append(f"{{{key}}}" if value is _MISSING else format(value))
+        return "".join(parts)
+
+
+class _ArticleTemplates:
+    """Compiled subject / body templates and merged defaults for one article."""
+
+    __slots__ = ("article", "defaults", "subject", "body", "placeholders")
+
+    def __init__(self, article: KnowledgeArticle, metadata_defaults: Dict[str, str]) -> None:
+        self.article = article
+        self.defaults = metadata_defaults | article.metadata
+        self.subject = _CompiledTemplate(article.subject)
+        self.body = _CompiledTemplate(article.response_template)
+        self.placeholders = self.subject.placeholders | self.body.placeholders
+
+
+_FALLBACK_BODY = _CompiledTemplate(
+    "Hello {student_name},\n\n"
+    "Thanks for contacting the advising office. Your question has been routed to an advisor "
+    "for a personal response. We will review the details and get back to you within one business day."
+    "\n\nBest,\nAcademic Advising Team"
+)
+
+
 class ReferenceRetriever(Protocol):
     """Protocol for retrieving supporting documents for a response."""
 
@@ -89,7 +154,9 @@ class EmailAdvisor:
         self._category_token_sets: List[set[str]] = []
         self._utterance_token_sets: List[List[List[str]]] = []
         self._domain_vocabulary: set[str] = set()
+        self._article_templates: Dict[str, _ArticleTemplates] = {}
         for article in self.knowledge_base:
+            self._article_templates[article.id] = _ArticleTemplates(article, self.metadata_defaults)
             tokens = tokenize(
                 " ".join(
                     list(article.utterances)
@@ -284,6 +351,7 @@ class EmailAdvisor:
             reasons.append("Matched article could not be found in the knowledge base.")
             reasons.extend(metadata_notes)
             return self._fallback_response(query, metadata, reasons, matches)
+        missing_keys, used_default_keys = self.template_gaps(article, metadata)
         response, context = self._render_article(article, metadata)
         references = self._get_references(query, article, reasons)
         subject, body = self.email_composer.compose(
@@ -291,12 +359,12 @@ class EmailAdvisor:
             base_subject=response["subject"],
             base_body=response["body"],
             query=query,
-            metadata=dict(context),
+            metadata=context,
             references=references,
         )
         auto_send = (
             best_match.confidence >= self.confidence_settings.auto_send_threshold
-            and not context.missing_keys
+            and not missing_keys
         )
         decision = "auto_send" if auto_send else "needs_review"
         if not auto_send:
@@ -304,13 +372,13 @@ class EmailAdvisor:
                 reasons.append(
                     "Confidence below the auto-send threshold; sending draft for review."
                 )
-            if context.missing_keys:
-                missing = ", ".join(sorted(context.missing_keys))
+            if missing_keys:
+                missing = ", ".join(sorted(missing_keys))
                 reasons.append(
                     f"Template placeholders missing values: {missing}. Advisor review required."
                 )
-        if context.used_default_keys:
-            defaults_used = ", ".join(sorted(context.used_default_keys))
+        if used_default_keys:
+            defaults_used = ", ".join(sorted(used_default_keys))
             reasons.append(
                 f"Default values used for: {defaults_used}. Update metadata if more specific details are available."
             )
@@ -328,13 +396,40 @@ class EmailAdvisor:
             references=references,
         )
 
+    def template_gaps(
+        self, article: KnowledgeArticle, metadata: Dict[str, str]
+    ) -> tuple[set[str], set[str]]:
+        """Return ``(missing_keys, used_default_keys)`` for rendering *article*.
+
+        Worked out from the precompiled placeholder sets, without rendering.
+        """
+        templates = self._templates_for(article)
+        missing_keys: set[str] = set()
+        used_default_keys: set[str] = set()
+        for key in templates.placeholders:
+            if key in metadata:
+                continue
+            if key in templates.defaults:
+                used_default_keys.add(key)
+            else:
+                missing_keys.add(key)
+        return missing_keys, used_default_keys
+
+    def _templates_for(self, article: KnowledgeArticle) -> _ArticleTemplates:
+        templates = self._article_templates.get(article.id)
+        if templates is None or templates.article is not article:
+            templates = _ArticleTemplates(article, self.metadata_defaults)
+            self._article_templates[article.id] = templates
+        return templates
+
     def _render_article(
         self, article: KnowledgeArticle, metadata: Dict[str, str]
-    ) -> tuple[Dict[str, str], _TemplateContext]:
-        context = _TemplateContext(self.metadata_defaults | article.metadata, metadata)
-        subject = article.subject.format_map(context)
-        body = article.response_template.format_map(context)
-        return {"subject": subject, "body": body}, context
+    ) -> tuple[Dict[str, str], Dict[str, str]]:
+        templates = self._templates_for(article)
+        values = templates.defaults | metadata
+        subject = templates.subject.render(values)
+        body = templates.body.render(values)
+        return {"subject": subject, "body": body}, values
 
     def _fallback_response(
         self,
@@ -343,14 +438,8 @@ class EmailAdvisor:
         reasons: List[str],
         matches: Optional[List[RankedMatch]] = None,
     ) -> AdvisorResponse:
-        context = _TemplateContext(self.metadata_defaults, metadata)
         subject = "Advising team follow-up required"
-        body = (
-            "Hello {student_name},\n\n"
-            "Thanks for contacting the advising office. Your question has been routed to an advisor "
-            "for a personal response. We will review the details and get back to you within one business day."
-            "\n\nBest,\nAcademic Advising Team"
-        ).format_map(context)
+        body = _FALLBACK_BODY.render(self.metadata_defaults | metadata)
         if not reasons:
             reasons.append("Unable to determine an appropriate template.")
         references = self._get_references(query, None, reasons)
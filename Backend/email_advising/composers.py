@@ -1,12 +1,38 @@
 """Email composition helpers, including LLM-backed workflows."""
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import inspect
 import json
+import queue
+import re
 import textwrap
-from typing import Callable, Dict, Sequence, Tuple
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 from .models import AdvisorReference, KnowledgeArticle
 
+LLMResult = Union[str, Awaitable[str], Iterator[str], AsyncIterator[str]]
+LLMCallable = Callable[[str], LLMResult]
+
+_CHUNK = "chunk"
+_DONE = "done"
+_ERROR = "error"
+
 
 class EmailComposer:
     """Interface for classes that produce final email subject and body text."""
@@ -58,20 +84,52 @@ class TemplateEmailComposer(EmailComposer):
 
 
 class LLMEmailComposer(EmailComposer):
-    """Compose emails with the help of a Large Language Model (LLM)."""
+    """Compose emails with the help of a Large Language Model (LLM).
+
+    ``llm`` may return a string, an awaitable string, or a sync / async
+    iterator of text chunks for streaming models.  Calls run on a bounded
+    worker pool of ``max_concurrency`` threads.  The template composer is
+    used instead when the call fails, exceeds ``timeout`` seconds overall
+    (including time spent waiting for a free worker), or produces no usable
+    body within ``first_body_timeout`` seconds.  A call that times out
+    while still running is abandoned: the pool is replaced so the hung
+    thread no longer holds a worker, and while ``max_concurrency`` abandoned
+    calls are still running the LLM is skipped altogether.  Responses that
+    parse are cached by a hash of the prompt, keeping up to ``cache_size``
+    entries; set it to 0 to disable caching.
+    """
 
     def __init__(
         self,
-        llm: Callable[[str], str],
+        llm: LLMCallable,
         *,
         style: str = "professional",
         fallback_composer: TemplateEmailComposer | None = None,
         ensure_references: bool = True,
+        timeout: Optional[float] = 30.0,
+        first_body_timeout: Optional[float] = None,
+        max_concurrency: int = 4,
+        cache_size: int = 256,
     ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if timeout is not None and timeout <= 0:
+            raise ValueError("timeout must be positive")
+        if first_body_timeout is not None and first_body_timeout <= 0:
+            raise ValueError("first_body_timeout must be positive")
         self.llm = llm
         self.style = style
         self.fallback_composer = fallback_composer or TemplateEmailComposer()
         self.ensure_references = ensure_references
+        self.timeout = timeout
+        self.first_body_timeout = first_body_timeout
+        self.max_concurrency = max_concurrency
+        self.cache_size = max(cache_size, 0)
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._executor = self._new_executor()
+        self._executor_lock = threading.Lock()
+        self._abandoned: "set[Future]" = set()
 
     def compose(
         self,
@@ -83,11 +141,43 @@ class LLMEmailComposer(EmailComposer):
         metadata: Dict[str, str],
         references: Sequence[AdvisorReference],
     ) -> Tuple[str, str]:
+        draft = (base_subject, base_body)
+        for draft in self.stream_compose(
+            article=article,
+            base_subject=base_subject,
+            base_body=base_body,
+            query=query,
+            metadata=metadata,
+            references=references,
+        ):
+            pass
+        return draft
+
+    def stream_compose(
+        self,
+        *,
+        article: KnowledgeArticle,
+        base_subject: str,
+        base_body: str,
+        query: str,
+        metadata: Dict[str, str],
+        references: Sequence[AdvisorReference],
+    ) -> Iterator[Tuple[str, str]]:
+        """Yield ``(subject, body)`` drafts as the LLM response streams in.
+
+        Intermediate drafts carry the body received so far.  The last draft
+        yielded is always the final email, which is the template result if
+        the LLM failed or ran out of time.
+        """
         prompt = self._build_prompt(article, base_subject, base_body, query, metadata, references)
+        parser = _StreamingDraftParser()
         try:
-            raw_response = self.llm(prompt)
+            for chunk in self._stream_response(prompt, parser):
+                subject, body = parser.feed(chunk)
+                if body and body.strip():
+                    yield (subject or base_subject), body
         except Exception:
-            return self.fallback_composer.compose(
+            yield self.fallback_composer.compose(
                 article=article,
                 base_subject=base_subject,
                 base_body=base_body,
@@ -95,12 +185,135 @@ class LLMEmailComposer(EmailComposer):
                 metadata=metadata,
                 references=references,
             )
-        subject, body = self._parse_response(raw_response, base_subject, base_body)
+            return
+        subject, body = self._parse_response(parser.text, base_subject, base_body)
         if self.ensure_references and references:
             reference_text = self.fallback_composer.format_references(references)
             if reference_text not in body:
                 body = body.rstrip() + "\n\n" + reference_text
-        return subject, body
+        yield subject, body
+
+    def close(self) -> None:
+        """Release the worker pool without waiting for in-flight calls."""
+
+        self._executor.shutdown(wait=False)
+
+    @property
+    def abandoned_calls(self) -> int:
+        """Timed-out LLM calls whose threads are still running."""
+
+        with self._executor_lock:
+            return len(self._abandoned)
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="llm-composer"
+        )
+
+    def _submit(self, *args: object) -> Future:
+        with self._executor_lock:
+            if len(self._abandoned) >= self.max_concurrency:
+                raise RuntimeError("LLM backend is stalled; too many abandoned calls")
+            return self._executor.submit(self._produce, *args)
+
+    def _abandon(self, future: Future) -> None:
+        """Give up on a hung call: move new calls to a fresh pool of workers."""
+
+        with self._executor_lock:
+            if future.done():
+                return
+            self._abandoned.add(future)
+            stale, self._executor = self._executor, self._new_executor()
+        future.add_done_callback(self._forget_abandoned)
+        stale.shutdown(wait=False)
+
+    def _forget_abandoned(self, future: Future) -> None:
+        with self._executor_lock:
+            self._abandoned.discard(future)
+
+    def _stream_response(self, prompt: str, parser: "_StreamingDraftParser") -> Iterator[str]:
+        """Yield raw response chunks for *prompt*, serving repeats from the cache.
+
+        Raises ``TimeoutError`` when the overall budget, or the budget for a
+        first usable body, runs out.
+        """
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        if self.cache_size:
+            with self._cache_lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+            if cached is not None:
+                yield cached
+                return
+
+        events: "queue.Queue[Tuple[str, object]]" = queue.Queue()
+        abort = threading.Event()
+        started = time.monotonic()
+        deadline = started + self.timeout if self.timeout is not None else None
+        body_deadline = (
+            started + self.first_body_timeout if self.first_body_timeout is not None else None
+        )
+        future = self._submit(prompt, events, abort)
+        chunks = []
+        timed_out = False
+        try:
+            while True:
+                wait_until = deadline
+                if body_deadline is not None and not parser.has_body:
+                    wait_until = body_deadline if deadline is None else min(deadline, body_deadline)
+                remaining = None if wait_until is None else wait_until - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    timed_out = True
+                    raise TimeoutError("LLM response exceeded its latency budget")
+                try:
+                    kind, payload = events.get(timeout=remaining)
+                except queue.Empty:
+                    timed_out = True
+                    raise TimeoutError("LLM response exceeded its latency budget") from None
+                if kind == _ERROR:
+                    raise payload  # type: ignore[misc]
+                if kind == _DONE:
+                    break
+                chunks.append(payload)
+                yield payload  # type: ignore[misc]
+        finally:
+            abort.set()
+            if not future.cancel() and timed_out:
+                self._abandon(future)
+
+        raw = "".join(chunks)
+        if self.cache_size and _parses_as_draft(raw):
+            with self._cache_lock:
+                self._cache[key] = raw
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _produce(self, prompt: str, events: "queue.Queue", abort: threading.Event) -> None:
+        """Run the LLM on a worker thread and push its output onto *events*."""
+
+        try:
+            result = self.llm(prompt)
+            if inspect.isawaitable(result):
+                result = asyncio.run(_resolve(result))
+            if isinstance(result, str):
+                events.put((_CHUNK, result))
+            elif hasattr(result, "__aiter__"):
+                asyncio.run(_drain_async_stream(result, events, abort))
+            else:
+                try:
+                    for chunk in result:
+                        if abort.is_set():
+                            break
+                        events.put((_CHUNK, chunk))
+                finally:
+                    close = getattr(result, "close", None)
+                    if close is not None:
+                        close()
+            events.put((_DONE, None))
+        except Exception as exc:
+            events.put((_ERROR, exc))
 
     def _build_prompt(
         self,
@@ -151,4 +364,126 @@ class LLMEmailComposer(EmailComposer):
         return subject, body
 
 
+class _StreamingDraftParser:
+    """Incrementally extract ``subject`` and ``body`` from streamed JSON text.
+
+    Each ``feed`` only looks at text that arrived since the previous call:
+    key searches resume where they left off and string values are decoded
+    piece by piece, so a long response costs linear time overall.
+    """
+
+    _FIELD_RES = {
+        key: re.compile(r'"%s"\s*:\s*"' % key) for key in ("subject", "body")
+    }
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._search_from: Dict[str, int] = {}
+        self._scan_from: Dict[str, int] = {}  # next undecoded index of the value
+        self._values: Dict[str, str] = {}
+        self._closed: set = set()
+        self.has_body = False
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> Tuple[Optional[str], Optional[str]]:
+        """Append *chunk* and return the subject and body decoded so far."""
+
+        self._text += chunk
+        subject = self._field("subject")
+        body = self._field("body")
+        if body and body.strip():
+            self.has_body = True
+        return subject, body
+
+    def _field(self, key: str) -> Optional[str]:
+        if key in self._closed:
+            return self._values[key]
+        text = self._text
+        index = self._scan_from.get(key)
+        if index is None:
+            search_from = self._search_from.get(key, 0)
+            match = self._FIELD_RES[key].search(text, search_from)
+            if match is None:
+                # Resume at a key that may still be completed by later chunks
+                partial = text.rfind('"%s"' % key, search_from)
+                self._search_from[key] = (
+                    partial if partial != -1 else max(search_from, len(text) - len(key) - 1)
+                )
+                return None
+            index = match.end()
+            self._values[key] = ""
+        start = end = index
+        while index < len(text):
+            ch = text[index]
+            if ch == '"':
+                self._closed.add(key)
+                break
+            if ch == "\\":
+                step = self._escape_length(text, index)
+                if step is None:
+                    # Escape sequence split across chunks; wait for the rest
+                    break
+                index += step
+                end = index
+                continue
+            index += 1
+            end = index
+        self._scan_from[key] = end
+        if end > start:
+            try:
+                self._values[key] += json.loads('"' + text[start:end] + '"')
+            except json.JSONDecodeError:
+                self._closed.add(key)  # malformed escape; keep what decoded
+        return self._values[key]
+
+    @staticmethod
+    def _escape_length(text: str, index: int) -> Optional[int]:
+        """Length of the escape at *index*, or None if it is not complete yet.
+
+        A high surrogate (``\\ud83d``) is kept together with the low surrogate
+        that follows it, so the pair decodes to one character.
+        """
+        if text[index + 1:index + 2] != "u":
+            return 2 if index + 2 <= len(text) else None
+        if index + 6 > len(text):
+            return None
+        if not "d800" <= text[index + 2:index + 6].lower() <= "dbff":
+            return 6
+        if index + 8 > len(text):
+            return None
+        if text[index + 6:index + 8] != "\\u":
+            return 6
+        return 12 if index + 12 <= len(text) else None
+
+
+def _parses_as_draft(raw: str) -> bool:
+    """Whether *raw* is a JSON draft with a body, i.e. worth caching."""
+    try:
+        payload = json.loads(raw)
+    except json.JSONDecodeError:
+        return False
+    return isinstance(payload, dict) and bool(str(payload.get("body", "")).strip())
+
+
+async def _resolve(awaitable: Awaitable[str]) -> str:
+    return await awaitable
+
+
+async def _drain_async_stream(
+    stream: AsyncIterator[str], events: "queue.Queue", abort: threading.Event
+) -> None:
+    try:
+        async for chunk in stream:
+            if abort.is_set():
+                break
+            events.put((_CHUNK, chunk))
+    finally:
+        aclose = getattr(stream, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
 __all__ = ["EmailComposer", "TemplateEmailComposer", "LLMEmailComposer"]
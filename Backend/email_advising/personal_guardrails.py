@@ -6,9 +6,11 @@ and flags them so they are NEVER auto-sent.
 """
 from __future__ import annotations
 
-import re
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Sequence
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+from .text_processing import canonicalize_text
 
 
 @dataclass(frozen=True)
@@ -86,32 +88,99 @@ DEFAULT_KEYWORDS: List[str] = [
     "suspension",
 ]
 
+# Apostrophe, spacing and contraction variants ("i'm" / "i am", "can't" /
+# "cant") are folded by canonicalize_text, so each phrase is listed once.
 DEFAULT_PHRASES: List[str] = [
     "i don't know what to do",
     "i need help urgently",
     "i'm struggling",
-    "i am struggling",
     "i can't cope",
-    "i cant cope",
     "please help me",
     "i feel hopeless",
     "i'm in crisis",
-    "i am in crisis",
     "i have nowhere to turn",
     "i feel like giving up",
     "i can't take it anymore",
-    "i cant take it anymore",
     "i need someone to talk to",
     "i'm not okay",
-    "i am not okay",
     "i don't feel safe",
-    "i dont feel safe",
 ]
 
 
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text: str, index: int) -> bool:
+    """Return True when a regex ``\\b`` would match at *index* of *text*."""
+
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
+
+class _PatternAutomaton:
+    """Aho-Corasick automaton that finds every pattern occurrence in one pass.
+
+    Failure links are folded into a full transition table at build time, so
+    scanning costs one dictionary lookup per character regardless of how many
+    patterns are loaded.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        self.patterns = list(patterns)
+        self._lengths = [len(pattern) for pattern in self.patterns]
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for ch in pattern:
+                next_state = goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][ch] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(pattern_id)
+
+        fail = [0] * len(goto)
+        transitions: List[Dict[str, int]] = [{} for _ in goto]
+        queue = deque([0])
+        while queue:
+            state = queue.popleft()
+            if state == 0:
+                transitions[0] = dict(goto[0])
+            else:
+                transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(ch, 0) if state else 0
+                outputs[child] = outputs[child] + outputs[fail[child]]
+                queue.append(child)
+        self._transitions = transitions
+        self._outputs = outputs
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """Yield ``(start, end, pattern_id)`` for every occurrence in *text*."""
+
+        transitions = self._transitions
+        outputs = self._outputs
+        lengths = self._lengths
+        state = 0
+        for end, ch in enumerate(text, start=1):
+            state = transitions[state].get(ch, 0)
+            for pattern_id in outputs[state]:
+                yield end - lengths[pattern_id], end, pattern_id
+
+
 class PersonalEmailDetector:
     """Scans email text for personal / sensitive content.
 
+    Text and terms are both passed through ``canonicalize_text`` so that
+    case, accents, curly quotes, whitespace and contractions do not matter.
+    Terms that canonicalize to the same pattern are matched once and
+    reported under their first spelling.
+
     Parameters
     ----------
     keywords : list of str, optional
@@ -128,17 +197,39 @@ class PersonalEmailDetector:
         self.keywords = list(keywords or DEFAULT_KEYWORDS)
         self.phrases = list(phrases or DEFAULT_PHRASES)
 
-        # Pre-compile regex patterns for efficient matching
-        # Keywords use word-boundary matching so "class" won't match "classification"
-        self._keyword_patterns = [
-            (kw, re.compile(r"\b" + re.escape(kw.lower()) + r"\b"))
-            for kw in self.keywords
-        ]
-        # Phrases are matched as-is (already multi-word)
-        self._phrase_patterns = [
-            (ph, re.compile(re.escape(ph.lower())))
-            for ph in self.phrases
-        ]
+        # All keywords and phrases share one automaton, so each email is
+        # scanned once no matter how long the lists grow.  Each distinct
+        # canonical pattern maps back to the first (kind, list index) entry
+        # of each kind that produced it.
+        pattern_ids: Dict[str, int] = {}
+        self._targets: List[List[Tuple[str, int]]] = []
+        for kind, terms in (("keyword", self.keywords), ("phrase", self.phrases)):
+            for index, term in enumerate(terms):
+                pattern = canonicalize_text(term)
+                if not pattern:
+                    continue
+                pattern_id = pattern_ids.setdefault(pattern, len(pattern_ids))
+                if pattern_id == len(self._targets):
+                    self._targets.append([])
+                targets = self._targets[pattern_id]
+                if all(existing_kind != kind for existing_kind, _ in targets):
+                    targets.append((kind, index))
+        self._automaton = _PatternAutomaton(list(pattern_ids))
+
+    def is_personal(self, text: str) -> bool:
+        """Return True as soon as any keyword or phrase is found in *text*.
+
+        Cheaper than :meth:`check` for callers that only need the verdict,
+        since scanning stops at the first qualifying match.
+        """
+        canonical_text = canonicalize_text(text)
+        for start, end, pattern_id in self._automaton.iter_matches(canonical_text):
+            for kind, _ in self._targets[pattern_id]:
+                if kind == "phrase":
+                    return True
+                if _is_boundary(canonical_text, start) and _is_boundary(canonical_text, end):
+                    return True
+        return False
 
     def check(self, text: str) -> GuardrailResult:
         """Check *text* for personal / sensitive content.
@@ -146,18 +237,20 @@ class PersonalEmailDetector:
         Returns a ``GuardrailResult`` with ``is_personal=True`` when at
         least one keyword **or** phrase is detected.
         """
-        lower_text = text.lower()
-        matched_keywords: List[str] = []
-        matched_phrases: List[str] = []
-
-        for kw, pattern in self._keyword_patterns:
-            if pattern.search(lower_text):
-                matched_keywords.append(kw)
+        canonical_text = canonicalize_text(text)
+        keyword_hits: set[int] = set()
+        phrase_hits: set[int] = set()
 
-        for ph, pattern in self._phrase_patterns:
-            if pattern.search(lower_text):
-                matched_phrases.append(ph)
+        for start, end, pattern_id in self._automaton.iter_matches(canonical_text):
+            for kind, index in self._targets[pattern_id]:
+                if kind == "phrase":
+                    phrase_hits.add(index)
+                # Keywords use word-boundary matching so "class" won't match "classification"
+                elif _is_boundary(canonical_text, start) and _is_boundary(canonical_text, end):
+                    keyword_hits.add(index)
 
+        matched_keywords = [self.keywords[index] for index in sorted(keyword_hits)]
+        matched_phrases = [self.phrases[index] for index in sorted(phrase_hits)]
         is_personal = bool(matched_keywords or matched_phrases)
         return GuardrailResult(
             is_personal=is_personal,
@@ -72,6 +72,32 @@ _TOKEN_SYNONYMS = {
 
 _WORD_RE = re.compile(r"[^a-z0-9]+")
 
+# Straight, curly and modifier apostrophes between word characters are
+# dropped so "can't", "can’t" and "cant" collapse to the same token.
+_APOSTROPHE_RE = re.compile(r"(?<=\w)['\u2018\u2019\u02bc`\u00b4](?=\w)")
+
+_CONTRACTIONS = {
+    "arent": "are not",
+    "cannot": "can not",
+    "cant": "can not",
+    "couldnt": "could not",
+    "didnt": "did not",
+    "doesnt": "does not",
+    "dont": "do not",
+    "hasnt": "has not",
+    "havent": "have not",
+    "im": "i am",
+    "isnt": "is not",
+    "ive": "i have",
+    "shouldnt": "should not",
+    "wasnt": "was not",
+    "werent": "were not",
+    "wont": "will not",
+    "wouldnt": "would not",
+    "youre": "you are",
+}
+_CONTRACTION_RE = re.compile(r"\b(" + "|".join(_CONTRACTIONS) + r")\b")
+
 
 def _strip_accents(value: str) -> str:
     normalized = unicodedata.normalize("NFKD", value)
@@ -86,6 +112,17 @@ def normalize_text(text: str) -> str:
     return re.sub(r"\s+", " ", collapsed).strip()
 
 
+def canonicalize_text(text: str) -> str:
+    """Return :func:`normalize_text` output with contractions expanded.
+
+    Apostrophe and spelling variants such as "I'm", "I’m", "Im" and "I am"
+    all canonicalize to ``"i am"``.
+    """
+
+    normalized = normalize_text(_APOSTROPHE_RE.sub("", text))
+    return _CONTRACTION_RE.sub(lambda match: _CONTRACTIONS[match.group(1)], normalized)
+
+
 def tokenize(text: str) -> List[str]:
     """Tokenize *text* into normalized word tokens."""
 
@@ -123,4 +160,4 @@ def _iterate_bigrams(tokens: Sequence[str]) -> Iterable[tuple[str, str]]:
         yield tokens[index], tokens[index + 1]
 
 
-__all__ = ["augment_tokens", "normalize_text", "tokenize"]
+__all__ = ["augment_tokens", "canonicalize_text", "normalize_text", "tokenize"]
@@ -0,0 +1,15 @@
+import pytest
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """The FastAPI module, imported with its SQLite database in a temp dir."""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("googleapiclient")
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(tmp_path_factory.mktemp("db"))
+    import api as api_module
+
+    yield api_module
+    monkeypatch.undo()
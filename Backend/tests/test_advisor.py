@@ -1,6 +1,10 @@
+import asyncio
 import json
 from pathlib import Path
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 
@@ -15,6 +19,8 @@ from email_advising import (
     load_knowledge_base,
     load_reference_corpus,
 )
+from email_advising.composers import _StreamingDraftParser
+from email_advising.models import AdvisorReference, KnowledgeArticle, KnowledgeBase
 
 
 @pytest.fixture(scope="module")
@@ -128,3 +134,204 @@ def test_ambiguous_queries_require_review(advisor: EmailAdvisor) -> None:
     assert response.auto_send is False
     assert response.article_id is None
     assert any("Multiple templates" in reason for reason in response.reasons)
+
+
+class FakeLLM:
+    """Local stand-in for an LLM endpoint that adds artificial latency."""
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.active -= 1
+        return json.dumps({"subject": "LLM subject", "body": "LLM body [1]"})
+
+
+def _compose_kwargs(knowledge_base, query: str = "transcript"):
+    return dict(
+        article=knowledge_base.articles[0],
+        base_subject="Template subject",
+        base_body="Template body",
+        query=query,
+        metadata={"student_name": "Morgan"},
+        references=[
+            AdvisorReference(
+                document_id="doc", title="Registrar", snippet="", url=None, score=1.0
+            )
+        ],
+    )
+
+
+def _compose(composer: LLMEmailComposer, knowledge_base, query: str = "transcript"):
+    return composer.compose(**_compose_kwargs(knowledge_base, query))
+
+
+def test_llm_composer_times_out_to_template(knowledge_base) -> None:
+    composer = LLMEmailComposer(FakeLLM(latency=0.5), timeout=0.05)
+    started = time.perf_counter()
+    subject, body = _compose(composer, knowledge_base)
+    assert time.perf_counter() - started < 0.4
+    assert subject == "Template subject"
+    assert body.startswith("Template body")
+    assert "References:" in body
+
+
+def test_llm_composer_supports_async_callables(knowledge_base) -> None:
+    async def async_llm(prompt: str) -> str:
+        await asyncio.sleep(0.01)
+        return json.dumps({"subject": "Async subject", "body": "Async body"})
+
+    subject, body = _compose(LLMEmailComposer(async_llm), knowledge_base)
+    assert subject == "Async subject"
+    assert body.startswith("Async body")
+
+
+def test_llm_composer_caches_by_prompt(knowledge_base) -> None:
+    llm = FakeLLM(latency=0.01)
+    composer = LLMEmailComposer(llm)
+    first = _compose(composer, knowledge_base)
+    second = _compose(composer, knowledge_base)
+    _compose(composer, knowledge_base, query="a different question")
+    assert first == second
+    assert llm.calls == 2
+
+
+def test_llm_composer_limits_concurrency(knowledge_base) -> None:
+    llm = FakeLLM(latency=0.05)
+    composer = LLMEmailComposer(llm, max_concurrency=2, cache_size=0)
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(
+            pool.map(lambda i: _compose(composer, knowledge_base, f"question {i}"), range(6))
+        )
+    assert all(subject == "LLM subject" for subject, _ in results)
+    assert llm.calls == 6
+    assert llm.peak_active == 2
+
+
+def test_llm_composer_does_not_cache_unparseable_output(knowledge_base) -> None:
+    calls = []
+
+    def flaky_llm(prompt: str) -> str:
+        calls.append(prompt)
+        if len(calls) == 1:
+            return "Sorry, I can't help with that."
+        return json.dumps({"subject": "LLM subject", "body": "LLM body"})
+
+    composer = LLMEmailComposer(flaky_llm, ensure_references=False)
+    assert _compose(composer, knowledge_base)[0] == "Template subject"
+    assert _compose(composer, knowledge_base)[0] == "LLM subject"
+    assert len(calls) == 2
+
+
+def test_llm_composer_abandons_hung_calls(knowledge_base) -> None:
+    release = threading.Event()
+    calls = []
+
+    def llm(prompt: str) -> str:
+        calls.append(prompt)
+        if len(calls) <= 2:
+            release.wait(5)  # a stalled backend
+        return json.dumps({"subject": "LLM subject", "body": "LLM body"})
+
+    composer = LLMEmailComposer(llm, timeout=0.05, max_concurrency=2, cache_size=0)
+    for query in ("first", "second"):
+        assert _compose(composer, knowledge_base, query)[0] == "Template subject"
+    assert composer.abandoned_calls == 2
+
+    # Both hung threads are still running: skip the LLM instead of queueing
+    assert _compose(composer, knowledge_base, "third")[0] == "Template subject"
+    assert len(calls) == 2
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while composer.abandoned_calls and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert _compose(composer, knowledge_base, "fourth")[0] == "LLM subject"
+
+
+def _streamed_response(delay: float = 0.0, stall_before_body: float = 0.0):
+    payload = json.dumps({"subject": "Streamed subject", "body": "First part. Second part."})
+    split = payload.index("First")
+    yield payload[:split]
+    time.sleep(stall_before_body)
+    for index in range(split, len(payload), 8):
+        time.sleep(delay)
+        yield payload[index:index + 8]
+
+
+def test_llm_composer_streams_partial_drafts(knowledge_base) -> None:
+    composer = LLMEmailComposer(lambda prompt: _streamed_response(), ensure_references=False)
+    drafts = list(composer.stream_compose(**_compose_kwargs(knowledge_base)))
+    assert len(drafts) > 2
+    assert all(subject == "Streamed subject" for subject, _ in drafts)
+    assert drafts[0][1] != drafts[-1][1]
+    assert "First part. Second part.".startswith(drafts[0][1])
+    assert drafts[-1] == ("Streamed subject", "First part. Second part.")
+
+
+def test_llm_composer_stalled_stream_falls_back(knowledge_base) -> None:
+    composer = LLMEmailComposer(
+        lambda prompt: _streamed_response(stall_before_body=0.5),
+        first_body_timeout=0.05,
+    )
+    started = time.perf_counter()
+    subject, body = _compose(composer, knowledge_base)
+    assert time.perf_counter() - started < 0.4
+    assert subject == "Template subject"
+    assert body.startswith("Template body")
+
+
+def test_llm_composer_accepts_async_streams(knowledge_base) -> None:
+    async def async_stream(prompt: str):
+        for chunk in _streamed_response():
+            await asyncio.sleep(0)
+            yield chunk
+
+    subject, body = _compose(
+        LLMEmailComposer(async_stream, ensure_references=False), knowledge_base
+    )
+    assert (subject, body) == ("Streamed subject", "First part. Second part.")
+
+
+def test_streaming_parser_decodes_split_escapes() -> None:
+    draft = {"subject": 'Re: "Form" \\ status', "body": "Line one\nEmoji 😀 and é\ttab"}
+    payload = json.dumps(draft)
+    parser = _StreamingDraftParser()
+    bodies = []
+    for char in payload:  # worst case: every escape split across chunks
+        subject, body = parser.feed(char)
+        if body is not None:
+            bodies.append(body)
+    assert (subject, body) == (draft["subject"], draft["body"])
+    assert all(draft["body"].startswith(partial) for partial in bodies)
+
+
+def test_template_gaps_known_before_rendering() -> None:
+    article = KnowledgeArticle(
+        id="deadline",
+        subject="Deadline for {term}",
+        categories=["deadline"],
+        utterances=["when is the deadline"],
+        response_template="Hi {student_name}, {{office}} closes on {closing_date:>12}.",
+        metadata={"term": "Fall 2024"},
+    )
+    advisor = EmailAdvisor(KnowledgeBase([article]))
+    missing, defaults = advisor.template_gaps(article, {"student_name": "Sam"})
+    assert missing == {"closing_date"}
+    assert defaults == {"term"}
+    response, context = advisor._render_article(article, {"student_name": "Sam"})
+    assert response["subject"] == "Deadline for Fall 2024"
+    assert response["body"] == "Hi Sam, {office} closes on {closing_date}."
+    assert context["student_name"] == "Sam"
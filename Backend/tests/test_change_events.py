@@ -0,0 +1,126 @@
+from pathlib import Path
+import asyncio
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+
+def _store(api, db, subject):
+    email_obj = api.EmailORM(
+        subject=subject,
+        body="When is the add/drop deadline?",
+        confidence=0.4,
+        status=api.EmailStatus.review,
+        suggested_reply="",
+        received_at=api.datetime.utcnow(),
+    )
+    db.add(email_obj)
+    return email_obj
+
+
+async def _drain(subscriber):
+    events = []
+    while (change := await subscriber.get(0.05)) is not None:
+        events.append(change)
+    return events
+
+
+def test_committed_changes_reach_subscribers(api, monkeypatch) -> None:
+    async def scenario():
+        broadcaster = api.EventBroadcaster(history=10, queue_size=10)
+        broadcaster.bind(asyncio.get_running_loop())
+        monkeypatch.setattr(api, "event_broadcaster", broadcaster)
+        db = api.SessionLocal()
+        try:
+            with broadcaster.subscribe() as subscriber:
+                _store(api, db, "Rolled back")
+                db.flush()
+                db.rollback()
+
+                email_obj = _store(api, db, "Deadline")
+                db.commit()
+                email_obj.status = api.EmailStatus.sent
+                api.record_metrics_change(
+                    db,
+                    (api.EmailStatus.review, 0.4),
+                    api.email_metrics_snapshot(email_obj),
+                )
+                db.commit()
+                events = await _drain(subscriber)
+        finally:
+            db.close()
+
+        assert [(e.kind, e.data.get("op")) for e in events] == [
+            ("email", "insert"),
+            ("email", "update"),
+            ("metrics", None),
+        ]
+        assert events[1].data["changed"] == ["status"]
+        assert events[2].data["deltas"] == {"review_count": -1, "sent_count": 1}
+        return broadcaster
+
+    broadcaster = asyncio.run(scenario())
+    assert broadcaster.stats()["clients"] == 0
+
+
+def test_slow_and_reconnecting_clients_resync(api) -> None:
+    async def scenario():
+        broadcaster = api.EventBroadcaster(history=3, queue_size=2, first_id=0)
+        broadcaster.bind(asyncio.get_running_loop())
+        with broadcaster.subscribe() as slow:
+            for i in range(5):
+                broadcaster.publish("sync", {"ingested": i})
+            await asyncio.sleep(0)
+            assert [e.kind for e in await _drain(slow)] == ["resync"]
+
+        with broadcaster.subscribe(last_event_id=3) as recent:
+            assert [e.id for e in await _drain(recent)] == [4, 5]
+        with broadcaster.subscribe(last_event_id=1) as stale:
+            assert [e.kind for e in await _drain(stale)] == ["resync"]
+
+    asyncio.run(scenario())
+
+
+def test_ids_from_a_previous_process_resync(api) -> None:
+    async def scenario():
+        before = api.EventBroadcaster(history=10, queue_size=10)
+        before.bind(asyncio.get_running_loop())
+        before.publish("sync", {"ingested": 1})
+        await asyncio.sleep(0)
+        old_id = before.stats()["last_event_id"]
+
+        # Restarted server: more events than the old process ever sent
+        after = api.EventBroadcaster(history=10, queue_size=10)
+        after.bind(asyncio.get_running_loop())
+        for i in range(5):
+            after.publish("sync", {"ingested": i})
+        await asyncio.sleep(0)
+
+        assert after.stats()["last_event_id"] > old_id
+        with after.subscribe(last_event_id=old_id) as reconnected:
+            assert [e.kind for e in await _drain(reconnected)] == ["resync"]
+
+    asyncio.run(scenario())
+
+
+def test_ids_ahead_of_this_process_resync(api) -> None:
+    async def scenario():
+        # Another worker (or a later boot) issued ids this process never saw
+        broadcaster = api.EventBroadcaster(history=10, queue_size=10, first_id=0)
+        broadcaster.bind(asyncio.get_running_loop())
+        broadcaster.publish("sync", {"ingested": 1})
+        await asyncio.sleep(0)
+
+        with broadcaster.subscribe(last_event_id=500) as ahead:
+            assert [e.kind for e in await _drain(ahead)] == ["resync"]
+        with broadcaster.subscribe(last_event_id=1) as current:
+            assert await _drain(current) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,73 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+
+@pytest.fixture()
+def client(api):
+    from fastapi.testclient import TestClient
+
+    return TestClient(api.app)  # no lifespan: background workers stay off
+
+
+def _revalidate(client, path):
+    first = client.get(path)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    again = client.get(path, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    return etag
+
+
+def test_emails_etag_changes_with_writes(api, client) -> None:
+    etag = _revalidate(client, "/emails")
+
+    db = api.SessionLocal()
+    try:
+        db.add(
+            api.EmailORM(
+                subject="Deadline",
+                body="When is the add/drop deadline?",
+                confidence=0.4,
+                status=api.EmailStatus.review,
+                suggested_reply="",
+                received_at=api.datetime.utcnow(),
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    changed = client.get("/emails", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_settings_and_corpora_revalidate(api, client) -> None:
+    # The first read creates the settings row
+    threshold = client.get("/email-settings").json()["auto_send_threshold"]
+    etag = _revalidate(client, "/email-settings")
+    client.post("/email-settings", json={"auto_send_threshold": threshold / 2})
+    assert client.get("/email-settings", headers={"If-None-Match": etag}).status_code == 200
+    client.post("/email-settings", json={"auto_send_threshold": threshold})
+
+    for path, source in (
+        ("/knowledge-base", api.KB_JSON_PATH),
+        ("/reference-corpus", api.RC_JSON_PATH),
+    ):
+        etag = _revalidate(client, path)
+        # Any listed tag matches, weak or strong
+        header = f'"other", {etag.removeprefix("W/")}'
+        assert client.get(path, headers={"If-None-Match": header}).status_code == 304
+        # Built from the file's content, so every worker sends the same tag
+        assert etag.endswith(f'-{api.file_digest(source)}"')
@@ -0,0 +1,33 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("sqlalchemy")
+
+
+@pytest.mark.parametrize("database_url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_sqlite_gets_no_pool_sizing(api, database_url) -> None:
+    from sqlalchemy import create_engine, text
+
+    options = api.engine_pool_options(database_url)
+    assert options == {}
+    engine = create_engine(
+        database_url, **options, pool_recycle=api.DB_POOL_RECYCLE, pool_pre_ping=False
+    )
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
+
+
+def test_file_and_server_databases_get_pool_sizing(api) -> None:
+    for database_url in ("sqlite:///./emails.db", "postgresql://advisor@localhost/emails"):
+        assert api.engine_pool_options(database_url) == {
+            "pool_size": api.DB_POOL_SIZE,
+            "max_overflow": api.DB_MAX_OVERFLOW,
+            "pool_timeout": api.DB_POOL_TIMEOUT,
+        }
@@ -0,0 +1,101 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+
+def _store(api, db, subject):
+    email_obj = api.EmailORM(
+        subject=subject,
+        body="When is the add/drop deadline?",
+        confidence=0.4,
+        status=api.EmailStatus.review,
+        suggested_reply="",
+        received_at=api.datetime.utcnow(),
+    )
+    db.add(email_obj)
+    return email_obj
+
+
+def test_changes_cover_every_write_path(api) -> None:
+    db = api.SessionLocal()
+    try:
+        token = api.email_changes_since(db, None, limit=5000).token
+
+        edited = _store(api, db, "Edited")
+        removed = _store(api, db, "Removed")
+        db.commit()
+        assert api.email_changes_since(db, token, limit=10).deleted == []
+
+        edited.assigned_to = "Ana"
+        db.delete(removed)
+        db.commit()
+        bulk = api.ingest_email_chunk(
+            db,
+            [{"subject": "Bulk", "body": "Where do I find the course catalog?"}],
+            start_index=0,
+            threshold=0.8,
+            skip_duplicates=False,
+        )
+
+        changes = api.email_changes_since(db, token, limit=10)
+        assert changes.reset is False and changes.has_more is False
+        assert [e.id for e in changes.changed] == [edited.id, bulk[0]["email_id"]]
+        assert changes.changed[0].assigned_to == "Ana"
+        assert changes.deleted == [removed.id]
+
+        nothing = api.email_changes_since(db, changes.token, limit=10)
+        assert (nothing.changed, nothing.deleted) == ([], [])
+    finally:
+        db.close()
+
+
+def test_changes_page_within_one_version(api) -> None:
+    db = api.SessionLocal()
+    try:
+        token = api.email_changes_since(db, None, limit=5000).token
+        stored = [_store(api, db, f"Batch {i}") for i in range(5)]
+        db.commit()
+        assert len({e.version for e in stored}) == 1
+
+        seen = []
+        while True:
+            page = api.email_changes_since(db, token, limit=2)
+            seen += [e.id for e in page.changed]
+            token = page.token
+            if not page.has_more:
+                break
+        assert seen == [e.id for e in stored]
+
+        with pytest.raises(api.HTTPException):
+            api.email_changes_since(db, "not a token", limit=2)
+    finally:
+        db.close()
+
+
+def test_version_is_taken_at_commit(api) -> None:
+    def head(db):
+        return db.connection().execute(
+            api.select(api.EmailChangesORM.version).where(api.EmailChangesORM.id == 1)
+        ).scalar_one()
+
+    db = api.SessionLocal()
+    try:
+        before = head(db)
+        email_obj = _store(api, db, "Late version")
+        db.flush()
+        # Flushed but not committed: the counter row is not locked yet
+        assert head(db) == before
+
+        db.commit()
+        assert head(db) == before + 1
+        assert email_obj.version == before + 1
+    finally:
+        db.close()
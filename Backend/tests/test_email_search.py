@@ -0,0 +1,115 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+
+def _store(api, db, subject, body, student_name="Sam", status=None):
+    email_obj = api.EmailORM(
+        student_name=student_name,
+        subject=subject,
+        body=body,
+        confidence=0.5,
+        status=status or api.EmailStatus.review,
+        suggested_reply="",
+        received_at=api.datetime.utcnow(),
+    )
+    db.add(email_obj)
+    db.commit()
+    return email_obj
+
+
+def test_search_ranks_and_tracks_edits(api) -> None:
+    db = api.SessionLocal()
+    try:
+        subject_hit = _store(api, db, "Quasar internship credit", "Can it count?")
+        body_hit = _store(api, db, "Question", "Does a summer quasar project count for credit?")
+        _store(api, db, "Transcript", "How do I order a transcript?")
+
+        found = api.search_emails(db, "quasar")
+        assert found.total == 2
+        assert [hit.email.id for hit in found.results] == [subject_hit.id, body_hit.id]
+        assert "[quasar]" in found.results[1].snippet.lower()
+
+        # Prefix match on the last word; every word has to match
+        assert api.search_emails(db, "summer quas").total == 1
+
+        body_hit.body = "Never mind, I sorted it out."
+        db.commit()
+        assert api.search_emails(db, "quasar").total == 1
+
+        db.delete(subject_hit)
+        db.commit()
+        assert api.search_emails(db, "quasar").total == 0
+    finally:
+        db.close()
+
+
+def test_search_pages_and_filters(api) -> None:
+    db = api.SessionLocal()
+    try:
+        for i in range(5):
+            _store(api, db, f"Zephyr form {i}", "Where do I submit the zephyr form?")
+        _store(api, db, "Zephyr", "Sent already", status=api.EmailStatus.sent)
+
+        first = api.search_emails(db, "zephyr", limit=4)
+        assert (first.total, len(first.results)) == (6, 4)
+        rest = api.search_emails(db, "zephyr", limit=4, cursor=first.next_cursor)
+        assert len(rest.results) == 2 and rest.next_cursor is None
+        assert rest.total is None  # counted on the first page only
+        ranked = api.search_emails(db, "zephyr", limit=6).results
+        assert [hit.email.id for hit in first.results + rest.results] == [
+            hit.email.id for hit in ranked
+        ]
+        with pytest.raises(api.HTTPException):
+            api.search_emails(db, "zephyr", cursor="not-a-cursor")
+
+        sent = api.search_emails(db, "zephyr", status=api.EmailStatus.sent)
+        assert [hit.email.status for hit in sent.results] == [api.EmailStatus.sent]
+
+        # FTS5 operators in user input are searched as plain words
+        assert api.search_emails(db, 'zephyr" OR NEAR(').total == 0
+        with pytest.raises(api.HTTPException):
+            api.search_emails(db, "?!")
+    finally:
+        db.close()
+
+
+def test_like_fallback_without_fts5(api, monkeypatch) -> None:
+    from sqlalchemy import create_engine, inspect
+
+    # A build without FTS5 skips the index instead of failing the migration
+    monkeypatch.setattr(api, "sqlite_supports_fts5", lambda conn: False)
+    scratch = create_engine("sqlite://")
+    with scratch.begin() as conn:
+        api._migration_email_fts(conn)
+        assert not inspect(conn).has_table("emails_fts")
+    scratch.dispose()
+
+    monkeypatch.setattr(api, "EMAIL_FTS_ENABLED", False)
+    db = api.SessionLocal()
+    try:
+        stored = [_store(api, db, f"Nebula lab {i}", "Can the nebula lab count?") for i in range(3)]
+        first = api.search_emails(db, "nebula", limit=2)
+        assert first.total == 3
+        assert "[nebula]" in first.results[0].snippet.lower()
+        rest = api.search_emails(db, "nebula", limit=2, cursor=first.next_cursor)
+        assert (rest.next_cursor, rest.total) == (None, None)
+        assert [hit.email.id for hit in first.results + rest.results] == [
+            email_obj.id for email_obj in reversed(stored)
+        ]
+
+        # "_" and "%" in a term are matched literally, not as wildcards
+        underscored = _store(api, db, "Form nebula_lab", "Which nebula_lab form?")
+        _store(api, db, "Form nebulaxlab", "Which nebulaxlab form?")
+        literal = api.search_emails(db, "nebula_lab")
+        assert [hit.email.id for hit in literal.results] == [underscored.id]
+    finally:
+        db.close()
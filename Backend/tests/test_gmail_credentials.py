@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from pathlib import Path
+import json
+import sys
+import threading
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("google.oauth2")
+
+from google.oauth2.credentials import Credentials
+
+
+class FakeCredentials(Credentials):
+    """Credentials whose refresh() hands out numbered tokens without a network call."""
+
+    def __init__(self, expires_in: timedelta, refresh_token="refresh-token"):
+        super().__init__(token="token-0", refresh_token=refresh_token)
+        self.expiry = datetime.utcnow() + expires_in
+        self.refreshes = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def refresh(self, request):
+        self.release.wait(5)
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.utcnow() + timedelta(hours=1)
+
+
+def _manager(api, tmp_path, monkeypatch, creds):
+    token_path = tmp_path / "gmail_token.json"
+    token_path.write_text(json.dumps({"token": "stored", "email_address": "advisor@example.edu"}))
+    loads = []
+
+    def from_authorized_user_info(info, scopes=None):
+        loads.append(info)
+        return creds
+
+    monkeypatch.setattr(api.Credentials, "from_authorized_user_info", from_authorized_user_info)
+    return api.GmailCredentialManager(token_path), loads
+
+
+def test_credentials_are_loaded_once(api, tmp_path, monkeypatch) -> None:
+    creds = FakeCredentials(timedelta(hours=1))
+    manager, loads = _manager(api, tmp_path, monkeypatch, creds)
+
+    assert manager.get() == (creds, "advisor@example.edu")
+    assert manager.get() == (creds, "advisor@example.edu")
+    assert len(loads) == 1
+    assert creds.refreshes == 0
+
+
+def test_expiring_credentials_refresh_and_persist(api, tmp_path, monkeypatch) -> None:
+    creds = FakeCredentials(timedelta(minutes=1))
+    manager, _ = _manager(api, tmp_path, monkeypatch, creds)
+
+    assert manager.get()[0].token == "token-1"
+    stored = json.loads(manager.token_path.read_text())
+    assert stored["token"] == "token-1"
+    assert stored["email_address"] == "advisor@example.edu"
+
+    expired = FakeCredentials(timedelta(minutes=-1), refresh_token=None)
+    manager, _ = _manager(api, tmp_path, monkeypatch, expired)
+    assert manager.get() == (None, "advisor@example.edu")
+
+
+def test_refresh_ahead_does_not_block_callers(api, tmp_path, monkeypatch) -> None:
+    creds = FakeCredentials(api.GMAIL_REFRESH_MARGIN + timedelta(minutes=1))
+    creds.release.clear()
+    manager, _ = _manager(api, tmp_path, monkeypatch, creds)
+
+    # The refresh is parked on the I/O pool, yet callers get the valid token
+    assert manager.get()[0].token == "token-0"
+    pending = manager._refresh_ahead
+    assert manager.get()[0].token == "token-0"
+    assert manager._refresh_ahead is pending  # one refresh at a time
+
+    creds.release.set()
+    pending.result(timeout=5)
+    assert creds.refreshes == 1
+    assert manager.get()[0].token == "token-1"
+    assert json.loads(manager.token_path.read_text())["token"] == "token-1"
+
+
+def test_service_is_cached_per_thread_and_credentials(api, tmp_path, monkeypatch) -> None:
+    creds = FakeCredentials(timedelta(hours=1))
+    manager, _ = _manager(api, tmp_path, monkeypatch, creds)
+
+    service = manager.service()
+    assert manager.service() is service
+    assert api.gmail_discovery_document() is api.gmail_discovery_document()
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.service()))
+    thread.start()
+    thread.join()
+    assert other[0] is not None and other[0] is not service
+
+    manager.save(FakeCredentials(timedelta(hours=1)), "advisor@example.edu")
+    assert manager.service() is not service
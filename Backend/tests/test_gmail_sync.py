@@ -0,0 +1,485 @@
+import base64
+from email import message_from_bytes
+from email.message import EmailMessage
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("googleapiclient")
+
+from googleapiclient.errors import HttpError
+
+
+class _Request:
+    def __init__(self, service, name, fn):
+        self.service = service
+        self.name = name
+        self.fn = fn
+
+    def execute(self):
+        self.service.round_trips.append(self.name)
+        return self.fn()
+
+
+class _Batch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trips.append(f"batch[{len(self.requests)}]")
+        batches = sum(trip.startswith("batch[") for trip in self.service.round_trips)
+        if batches == self.service.fail_on_batch:
+            raise ConnectionError("connection reset")
+        for request_id, request in self.requests:
+            try:
+                response, error = request.fn(), None
+            except KeyError as exc:
+                response, error = None, exc
+            self.callback(request_id, response, error)
+
+
+class FakeGmail:
+    """Local stand-in for the Gmail API client used by run_gmail_sync."""
+
+    def __init__(self, emails, prefix="m"):
+        self.prefix = prefix
+        self.messages_by_id = {}
+        self.history_records = []
+        self.history_id = 1000
+        self.history_expired = False
+        self.round_trips = []
+        self.sent = []
+        self.sent_message_ids = []
+        # "before" fails a send outright, "after" loses the response of one that went out
+        self.send_failures = []
+        self.fail_on_batch = None  # raise on the Nth batch request, to simulate a crash
+        self.deliver(emails)
+
+    def deliver(self, emails):
+        """Add unread messages to the mailbox and record them in its history."""
+        for subject, body in emails:
+            index = len(self.messages_by_id)
+            message = EmailMessage()
+            message["Subject"] = subject
+            message["From"] = f"Student {index} <s{index}@columbia.edu>"
+            message.set_content(body)
+            msg_id = f"{self.prefix}{index}"
+            self.messages_by_id[msg_id] = {
+                "id": msg_id,
+                "threadId": f"{self.prefix}-thread{index}",
+                "raw": base64.urlsafe_b64encode(message.as_bytes()).decode(),
+                "labelIds": ["UNREAD"],
+                # 2023-11-14T22:13:20Z plus one minute per message
+                "internalDate": str(1_700_000_000_000 + index * 60_000),
+            }
+            self.history_id += 1
+            self.history_records.append(
+                {
+                    "id": str(self.history_id),
+                    "messagesAdded": [
+                        {"message": {"id": msg_id, "labelIds": ["INBOX", "UNREAD"]}}
+                    ],
+                }
+            )
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def getProfile(self, userId):
+        return _Request(self, "profile", lambda: {"historyId": str(self.history_id)})
+
+    def history(self):
+        return _History(self)
+
+    def new_batch_http_request(self, callback):
+        return _Batch(self, callback)
+
+    def list(self, userId, q=None, maxResults=100, pageToken=None):
+        def run():
+            if q and q.startswith("rfc822msgid:"):
+                wanted = q.split(":", 1)[1]
+                return {
+                    "messages": [
+                        {"id": f"sent{index}"}
+                        for index, message_id in enumerate(self.sent_message_ids)
+                        if message_id == wanted
+                    ]
+                }
+            matching = [
+                {"id": msg_id}
+                for msg_id, data in self.messages_by_id.items()
+                if q != "is:unread" or "UNREAD" in data["labelIds"]
+            ]
+            start = int(pageToken or 0)
+            page = {"messages": matching[start:start + maxResults]}
+            if start + maxResults < len(matching):
+                page["nextPageToken"] = str(start + maxResults)
+            return page
+
+        return _Request(self, "list", run)
+
+    def get(self, userId, id, format=None):
+        return _Request(self, "get", lambda: self.messages_by_id[id])
+
+    def batchModify(self, userId, body):
+        def apply():
+            for msg_id in body["ids"]:
+                labels = self.messages_by_id[msg_id]["labelIds"]
+                labels[:] = [label for label in labels if label not in body["removeLabelIds"]]
+            return {}
+
+        return _Request(self, "batchModify", apply)
+
+    def send(self, userId, body):
+        def run():
+            failure = self.send_failures.pop(0) if self.send_failures else None
+            if failure == "before":
+                raise HttpError(SimpleNamespace(status=503, reason="Unavailable"), b"")
+            self.sent.append(body)
+            raw = base64.urlsafe_b64decode(body["raw"])
+            self.sent_message_ids.append(message_from_bytes(raw)["Message-ID"])
+            if failure == "after":
+                raise TimeoutError("response lost")
+            return {"id": f"sent{len(self.sent) - 1}"}
+
+        return _Request(self, "send", run)
+
+
+class _History:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, userId, startHistoryId, historyTypes=None, pageToken=None):
+        def run():
+            if self.service.history_expired:
+                raise HttpError(SimpleNamespace(status=404, reason="Not Found"), b"")
+            records = [
+                record
+                for record in self.service.history_records
+                if int(record["id"]) > int(startHistoryId)
+            ]
+            return {"history": records, "historyId": str(self.service.history_id)}
+
+        return _Request(self.service, "history", run)
+
+
+@pytest.fixture
+def db(api):
+    session = api.SessionLocal()
+    api.get_or_create_settings(session).gmail_history_id = None
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_sync_batches_fetches_and_marks_read_once(api, db) -> None:
+    service = FakeGmail(
+        [("Deadline", f"When is the registration deadline? ({index})") for index in range(60)]
+        + [("Empty", "   ")]
+    )
+    result = api.run_gmail_sync(db, service, limit=100)
+    assert result["ingested"] == 60
+    assert result["incremental"] is False
+    assert service.round_trips == ["profile", "list", "batch[50]", "batch[11]", "batchModify"]
+    assert result["failed"] == 0
+    assert result["auto_queued"] == 0
+    assert all(
+        "UNREAD" not in data["labelIds"] for data in service.messages_by_id.values()
+    )
+    first = db.query(api.EmailORM).filter(api.EmailORM.gmail_message_id == "m1").one()
+    assert first.received_at == api.datetime(2023, 11, 14, 22, 14, 20)
+
+
+def test_received_at_falls_back_to_date_header(api) -> None:
+    message = EmailMessage()
+    message["Subject"] = "Overload"
+    message["From"] = "Student <s1@columbia.edu>"
+    message["Date"] = "Tue, 14 Nov 2023 17:13:20 -0500"
+    message.set_content("Can I take 22 points?")
+    raw = base64.urlsafe_b64encode(message.as_bytes()).decode()
+
+    parsed = api.parse_gmail_message({"id": "d1", "raw": raw})
+    assert parsed.received_at == api.datetime(2023, 11, 14, 22, 13, 20)
+    del message["Date"]
+    undated = {"id": "d2", "raw": base64.urlsafe_b64encode(message.as_bytes()).decode()}
+    assert api.parse_gmail_message(undated).received_at is None
+
+
+def test_sync_resumes_from_history(api, db) -> None:
+    service = FakeGmail([("Deadline", "When does add/drop end?")], prefix="hist")
+    api.run_gmail_sync(db, service, limit=10)
+    service.deliver([("Transcript", "How do I order a transcript?"), ("Leave", "Can I take a leave?")])
+    service.round_trips.clear()
+
+    result = api.run_gmail_sync(db, service, limit=10)
+    assert result["ingested"] == 2
+    assert result["incremental"] is True
+    assert service.round_trips == ["history", "batch[2]", "batchModify"]
+    assert api.get_or_create_settings(db).gmail_history_id == str(service.history_id)
+
+
+def test_history_sync_honours_limit(api, db) -> None:
+    service = FakeGmail([("Deadline", "When is the P/F deadline? (limit)")], prefix="lim")
+    api.run_gmail_sync(db, service, limit=10)
+    service.deliver(
+        [("Question", f"Can I audit a seminar? (limit {index})") for index in range(5)]
+    )
+
+    first = api.run_gmail_sync(db, service, limit=2)
+    assert (first["ingested"], first["incremental"]) == (2, True)
+    # Resumes after the last record taken, so the rest arrive next time
+    rest = api.run_gmail_sync(db, service, limit=10)
+    assert rest["ingested"] == 3
+    assert api.get_or_create_settings(db).gmail_history_id == str(service.history_id)
+
+
+def test_gmail_fetch_wakes_the_worker(api, monkeypatch) -> None:
+    worker = api.GmailSyncWorker(interval=3600)
+    synced = []
+    woken = api.threading.Event()
+
+    def run_once(limit=None):
+        synced.append(api.threading.current_thread().name)
+        woken.set()
+        return {"ingested": 1, "last_synced_at": None, "incremental": True}
+
+    monkeypatch.setattr(worker, "run_once", run_once)
+    monkeypatch.setattr(api, "gmail_sync_worker", worker)
+    monkeypatch.setattr(api, "require_gmail_connected", lambda: None)
+    monkeypatch.setattr(
+        api.gmail_credentials, "get", lambda: (SimpleNamespace(valid=True), "advisor@columbia.edu")
+    )
+    worker.start()
+    try:
+        assert woken.wait(5)  # the first tick syncs straight away
+        woken.clear()
+        report = api._gmail_fetch(limit=5)
+        assert report["triggered"] is True
+        assert report["worker_enabled"] is True
+        assert woken.wait(5)
+    finally:
+        worker.stop()
+    assert synced == ["gmail-sync", "gmail-sync"]
+
+
+def test_sync_falls_back_when_history_expired(api, db) -> None:
+    service = FakeGmail(
+        [("Help", "I need to withdraw from a class"), ("Help", "I need to withdraw from a class")],
+        prefix="dup",
+    )
+    first = api.run_gmail_sync(db, service, limit=10)
+    for data in service.messages_by_id.values():
+        data["labelIds"].append("UNREAD")
+    service.history_expired = True
+    service.round_trips.clear()
+
+    second = api.run_gmail_sync(db, service, limit=10)
+    stored = db.query(api.EmailORM).filter(api.EmailORM.gmail_thread_id == "dup-thread0").count()
+    assert first["ingested"] == 1
+    assert second["ingested"] == 0
+    assert second["incremental"] is False
+    assert service.round_trips[:3] == ["history", "profile", "list"]
+    assert stored == 1
+
+
+def test_backfill_resumes_from_checkpoint(api, db) -> None:
+    service = FakeGmail(
+        [("Question", f"Backfilled question number {index}") for index in range(130)],
+        prefix="bf",
+    )
+    checkpoint = api.get_backfill_checkpoint(db)
+    checkpoint.query = "in:inbox"
+    db.commit()
+
+    service.fail_on_batch = 2
+    with pytest.raises(RuntimeError, match="connection reset"):
+        api.run_gmail_backfill(db, service, page_size=60)
+    checkpoint = api.get_backfill_checkpoint(db)
+    assert checkpoint.status == "failed"
+    assert (checkpoint.page_token, checkpoint.last_message_id) == (None, "bf49")
+    assert checkpoint.processed == 50
+
+    service.fail_on_batch = None
+    service.round_trips.clear()
+    checkpoint = api.run_gmail_backfill(db, service, page_size=60)
+    stored = db.query(api.EmailORM).filter(api.EmailORM.gmail_message_id.like("bf%")).count()
+    assert checkpoint.status == "done"
+    assert checkpoint.processed == checkpoint.ingested == 130
+    assert stored == 130
+    assert service.round_trips[:2] == ["list", "batch[10]"]
+    assert not service.sent
+    # Backfill leaves Gmail read state alone unless asked to mark messages read
+    assert "batchModify" not in service.round_trips
+    assert all("UNREAD" in data["labelIds"] for data in service.messages_by_id.values())
+
+
+def test_failed_batch_rolls_back_alone(api, db) -> None:
+    service = FakeGmail(
+        [("Registration", f"How do I register for courses? (batch test {index})") for index in range(70)],
+        prefix="fail",
+    )
+    service.fail_on_batch = 2
+    result = api.run_gmail_sync(db, service, limit=100)
+    assert (result["ingested"], result["failed"]) == (50, 20)
+    # The failed batch stays unread and the history id is not advanced
+    unread = [msg_id for msg_id, data in service.messages_by_id.items() if "UNREAD" in data["labelIds"]]
+    assert unread == [f"fail{index}" for index in range(50, 70)]
+    assert api.get_or_create_settings(db).gmail_history_id is None
+
+    service.fail_on_batch = None
+    assert api.run_gmail_sync(db, service, limit=100)["ingested"] == 20
+
+
+def _make_due(api, db):
+    db.query(api.OutboxORM).update({api.OutboxORM.next_attempt_at: api.datetime.utcnow()})
+    db.commit()
+
+
+def test_outbox_retries_without_sending_twice(api, db) -> None:
+    settings = api.get_or_create_settings(db)
+    settings.auto_send_enabled = True
+    db.commit()
+    utterances = [u for article in api.knowledge_base.articles for u in article.utterances][:2]
+    service = FakeGmail([("Question", utterance) for utterance in utterances], prefix="out")
+    try:
+        result = api.run_gmail_sync(db, service, limit=10)
+    finally:
+        settings.auto_send_enabled = False
+        db.commit()
+    assert result["auto_queued"] == 2
+    assert not service.sent
+    sender = api.OutboxSender(rate=1000, burst=10)
+
+    # First attempt: one send fails, one goes out but its response is lost
+    service.send_failures = ["before", "after"]
+    sender.drain(service, "advisor@columbia.edu")
+    entries = db.query(api.OutboxORM).filter(api.OutboxORM.to_addr.like("s%@columbia.edu")).all()
+    assert {entry.state for entry in entries} == {"pending"}
+    assert len(service.sent) == 1
+
+    # Retry: the lost one is found by Message-ID instead of being resent
+    _make_due(api, db)
+    sender.drain(service, "advisor@columbia.edu")
+    db.expire_all()
+    assert {entry.state for entry in entries} == {"sent"}
+    assert [entry.attempts for entry in entries] == [2, 2]
+    assert len(service.sent) == 2
+    assert all(db.get(api.EmailORM, entry.email_id).status == api.EmailStatus.sent for entry in entries)
+
+    # Enqueueing the same reply again returns the delivered entry
+    email_obj = db.get(api.EmailORM, entries[0].email_id)
+    again = api.enqueue_reply(
+        db, email_obj.id, entries[0].to_addr, email_obj.subject, email_obj.suggested_reply
+    )
+    assert again.id == entries[0].id
+
+
+def _store_email(api, db, subject):
+    email_obj = api.EmailORM(
+        subject=subject,
+        body="Can I get an extension on my thesis?",
+        confidence=0.5,
+        status=api.EmailStatus.review,
+        suggested_reply="Yes, talk to your advisor.",
+        received_at=api.datetime.utcnow(),
+        email_address="s9@columbia.edu",
+    )
+    db.add(email_obj)
+    db.commit()
+    return email_obj
+
+
+def test_failed_reply_can_be_sent_again(api, db) -> None:
+    email_obj = _store_email(api, db, "Resend")
+    entry = api.enqueue_reply(
+        db, email_obj.id, email_obj.email_address, email_obj.subject, email_obj.suggested_reply
+    )
+    entry.state = api.OutboxState.failed
+    entry.attempts = api.OUTBOX_MAX_ATTEMPTS
+    entry.last_error = "503 Unavailable"
+    db.commit()
+
+    again = api.enqueue_reply(
+        db, email_obj.id, email_obj.email_address, email_obj.subject, email_obj.suggested_reply
+    )
+    db.commit()
+    assert again.id == entry.id
+    assert (again.state, again.attempts) == (api.OutboxState.pending, 0)
+
+    service = FakeGmail([], prefix="resend")
+    api.OutboxSender(rate=1000, burst=10).drain(service, "advisor@columbia.edu")
+    db.expire_all()
+    assert entry.state == api.OutboxState.sent
+    # The earlier attempt might have gone out, so the mailbox is checked first
+    assert service.round_trips == ["list", "send"]
+
+
+def test_only_expired_send_leases_are_reclaimed(api, db) -> None:
+    sender = api.OutboxSender(rate=1000, burst=10, worker_id="this-sender")
+    entries = []
+    for subject, claimed_at in (
+        ("Held send", api.datetime.utcnow()),
+        ("Orphaned send", api.datetime.utcnow() - 2 * sender.lease),
+    ):
+        email_obj = _store_email(api, db, subject)
+        entry = api.enqueue_reply(
+            db, email_obj.id, email_obj.email_address, subject, email_obj.suggested_reply
+        )
+        entry.state = api.OutboxState.sending
+        entry.attempts = 1
+        entry.claimed_by = "other-sender"
+        entry.claimed_at = claimed_at
+        entries.append(entry)
+    db.commit()
+
+    assert sender.reclaim_expired() == 1
+    db.expire_all()
+    held, orphaned = entries
+    assert (held.state, held.claimed_by) == (api.OutboxState.sending, "other-sender")
+    assert (orphaned.state, orphaned.claimed_by) == (api.OutboxState.pending, None)
+
+    for entry in entries:
+        entry.state = api.OutboxState.cancelled
+    db.commit()
+
+
+def test_reply_is_sent_outside_a_transaction(api, db, monkeypatch) -> None:
+    email_obj = _store_email(api, db, "No open transaction")
+    api.enqueue_reply(
+        db, email_obj.id, email_obj.email_address, email_obj.subject, email_obj.suggested_reply
+    )
+    db.commit()
+    sender = api.OutboxSender(rate=1000, burst=10)
+    entry = sender.claim(db)
+    assert entry.email_id == email_obj.id
+
+    send = api.send_email_via_gmail_api
+    in_transaction = []
+
+    def observed_send(**kwargs):
+        in_transaction.append(db.in_transaction())
+        return send(**kwargs)
+
+    monkeypatch.setattr(api, "send_email_via_gmail_api", observed_send)
+    sender.deliver(db, entry, FakeGmail([], prefix="notx"), "advisor@columbia.edu")
+
+    assert in_transaction == [False]
+    db.expire_all()
+    assert entry.state == api.OutboxState.sent
+    assert db.get(api.EmailORM, email_obj.id).status == api.EmailStatus.sent
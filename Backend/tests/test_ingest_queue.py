@@ -0,0 +1,170 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+
+
+def _enqueue(api, db, subject, body):
+    return api.ingest_queue.enqueue(
+        db, api.EmailIn(subject=subject, body=body, student_name="Sam")
+    )
+
+
+def test_queued_jobs_run_through_all_stages(api) -> None:
+    db = api.SessionLocal()
+    try:
+        routine = _enqueue(api, db, "Deadline", "When is the add/drop deadline?")
+        personal = _enqueue(api, db, "Help", "I'm struggling and need someone to talk to.")
+        assert routine.status == api.IngestJobStatus.queued
+
+        assert api.ingest_queue.drain() == 2
+
+        db.expire_all()
+        for job in (routine, personal):
+            assert job.status == api.IngestJobStatus.done
+            assert job.attempts == 1
+            assert db.get(api.EmailORM, job.email_id) is not None
+        assert db.get(api.EmailORM, personal.email_id).status == api.EmailStatus.personal
+    finally:
+        db.close()
+
+
+def test_interrupted_job_is_not_stored_twice(api) -> None:
+    db = api.SessionLocal()
+    try:
+        job = _enqueue(api, db, "Transcript", "How do I order an official transcript?")
+        api.ingest_queue.drain()
+        stored = db.query(api.EmailORM).count()
+
+        # Simulate a crash after persisting: the job is requeued on restart
+        job.status = api.IngestJobStatus.queued
+        db.commit()
+        api.ingest_queue.drain()
+
+        db.expire_all()
+        assert job.status == api.IngestJobStatus.done
+        assert job.attempts == 2
+        assert db.query(api.EmailORM).count() == stored
+    finally:
+        db.close()
+
+
+def test_bulk_chunk_reports_each_item(api) -> None:
+    db = api.SessionLocal()
+    try:
+        items = [
+            {"subject": "Bulk", "body": "Where do I find the course catalog? (bulk)"},
+            {"subject": "Bulk"},
+            {"subject": "Bulk", "body": "Where do I find the course catalog? (bulk)"},
+            {"subject": "Bulk", "body": "I'm struggling and need someone to talk to. (bulk)"},
+        ]
+        results = api.ingest_email_chunk(db, items, start_index=10, threshold=0.9)
+        assert [item["index"] for item in results] == [10, 11, 12, 13]
+        assert [item["result"] for item in results] == ["created", "invalid", "duplicate", "created"]
+        assert results[3]["status"] == api.EmailStatus.personal
+        assert db.get(api.EmailORM, results[0]["email_id"]).subject == "Bulk"
+
+        again = api.ingest_email_chunk(db, items[:1], start_index=0, threshold=0.9)
+        assert again[0]["result"] == "duplicate"
+    finally:
+        db.close()
+
+
+def test_content_hash_keeps_case_and_punctuation(api) -> None:
+    digest = api.email_content_hash("Drop deadline", "Can I still drop?\n\nThanks")
+    assert api.email_content_hash(" Drop  deadline", "Can I still drop? Thanks ") == digest
+    assert api.email_content_hash("Drop deadline", "Can I still drop. Thanks") != digest
+    assert api.email_content_hash("drop deadline", "Can I still drop? Thanks") != digest
+
+
+def test_only_stale_leases_are_requeued(api) -> None:
+    queue = api.IngestQueue(workers=0, worker_id="this-worker")
+    db = api.SessionLocal()
+    try:
+        held = _enqueue(api, db, "Held", "Can I switch advisors? (held elsewhere)")
+        orphaned = _enqueue(api, db, "Orphaned", "Can I switch advisors? (orphaned)")
+        now = api.datetime.utcnow()
+        for job, heartbeat_at in ((held, now), (orphaned, now - 2 * queue.lease)):
+            job.status = api.IngestJobStatus.running
+            job.claimed_by = "other-worker"
+            job.heartbeat_at = heartbeat_at
+        db.commit()
+
+        # Starting this queue leaves the live worker's job alone
+        queue.start()
+        queue.stop()
+        db.expire_all()
+        assert (held.status, held.claimed_by) == (api.IngestJobStatus.running, "other-worker")
+        assert (orphaned.status, orphaned.claimed_by) == (api.IngestJobStatus.queued, None)
+
+        # Once claimed, the job is leased to this worker and kept alive by its heartbeat
+        claimed = queue.claim(db)
+        assert claimed.id == orphaned.id and claimed.claimed_by == "this-worker"
+        claimed.heartbeat_at = now - 2 * queue.lease
+        db.commit()
+        assert queue.heartbeat() == 1
+        assert queue.requeue_stale() == 0
+
+        # The other worker died: its lease runs out and the job is queued again
+        held.heartbeat_at = now - 2 * queue.lease
+        db.commit()
+        assert queue.requeue_stale() == 1
+        db.expire_all()
+        assert held.status == api.IngestJobStatus.queued
+    finally:
+        for job in (held, orphaned):
+            job.status = api.IngestJobStatus.failed
+        db.commit()
+        db.close()
+
+
+def test_job_that_keeps_killing_workers_fails(api) -> None:
+    queue = api.IngestQueue(workers=0, worker_id="this-worker", max_attempts=2)
+    db = api.SessionLocal()
+    try:
+        poison = _enqueue(api, db, "Poison", "Can I audit a class? (poison)")
+        next_job = _enqueue(api, db, "Next", "Can I audit a class? (next)")
+        stale = api.datetime.utcnow() - 2 * queue.lease
+        for attempt in (1, 2):
+            # The worker dies mid-job; its lease runs out
+            claimed = queue.claim(db)
+            assert (claimed.id, claimed.attempts) == (poison.id, attempt)
+            claimed.heartbeat_at = stale
+            db.commit()
+            queue.requeue_stale()
+
+        db.expire_all()
+        assert poison.status == api.IngestJobStatus.failed
+        assert "2 times" in poison.error and poison.finished_at is not None
+        # ...and no longer blocks the head of the queue
+        assert queue.claim(db).id == next_job.id
+    finally:
+        next_job.status = api.IngestJobStatus.failed
+        db.commit()
+        db.close()
+
+
+def test_failed_job_records_its_stage(api, monkeypatch) -> None:
+    def broken_advisor(*args, **kwargs):
+        raise RuntimeError("advisor down")
+
+    monkeypatch.setattr(api, "classify_email", broken_advisor)
+    db = api.SessionLocal()
+    try:
+        job = _enqueue(api, db, "Broken", "Can I retake a course? (broken)")
+        assert api.ingest_queue.drain() >= 1
+        db.expire_all()
+        assert (job.status, job.stage, job.error) == (
+            api.IngestJobStatus.failed,
+            "advisor",
+            "advisor down",
+        )
+    finally:
+        db.close()
@@ -0,0 +1,131 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+
+def test_list_matches_email_schema_and_pages(api) -> None:
+    from fastapi.testclient import TestClient
+
+    db = api.SessionLocal()
+    try:
+        for i in range(3):
+            db.add(
+                api.EmailORM(
+                    student_name="Zoë",
+                    subject=f"Listing {i}",
+                    body="When is the add/drop deadline? " * 20,
+                    confidence=0.25 * i,
+                    status=api.EmailStatus.review,
+                    suggested_reply="",
+                    received_at=api.datetime(2030, 1, 1, 12, 0, i, 500 * i),
+                    assigned_to="Ana" if i else None,
+                )
+            )
+        db.commit()
+        expected = [
+            api.orm_to_schema(e).model_dump(mode="json")
+            for e in db.query(api.EmailORM)
+            .order_by(api.EmailORM.received_at.desc(), api.EmailORM.id.desc())
+            .limit(3)
+        ]
+    finally:
+        db.close()
+
+    client = TestClient(api.app)
+    first = client.get("/emails", params={"limit": 2})
+    assert first.json() == expected[:2]
+    rest = client.get("/emails", params={"limit": 2, "cursor": first.headers["X-Next-Cursor"]})
+    assert rest.json()[0] == expected[2]
+
+    compressed = client.get("/emails", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+
+
+def test_projection_and_single_email(api) -> None:
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    summary = client.get("/emails", params={"summary": "true", "limit": 2})
+    assert summary.status_code == 200
+    assert set(summary.json()[0]) == set(api.EMAIL_SUMMARY_FIELDS)
+
+    page = client.get("/emails", params={"fields": "subject,status", "limit": 1})
+    assert set(page.json()[0]) == {"id", "subject", "status"}
+    following = client.get(
+        "/emails",
+        params={"fields": "subject", "limit": 1, "cursor": page.headers["X-Next-Cursor"]},
+    )
+    assert following.json()[0]["id"] == summary.json()[1]["id"]
+
+    assert client.get("/emails", params={"fields": "subject,password"}).status_code == 400
+    assert client.get("/emails", params={"fields": "id", "summary": "true"}).status_code == 400
+
+    # The documented row shape allows for projections: only id is required
+    schemas = client.get("/openapi.json").json()["components"]["schemas"]
+    assert schemas["EmailListItem"]["required"] == ["id"]
+    assert set(schemas["EmailListItem"]["properties"]) == set(api.EMAIL_LIST_FIELDS)
+
+    email_id = page.json()[0]["id"]
+    full = client.get(f"/emails/{email_id}")
+    assert full.json()["body"] and full.json()["subject"] == page.json()[0]["subject"]
+    cached = client.get(f"/emails/{email_id}", headers={"If-None-Match": full.headers["ETag"]})
+    assert cached.status_code == 304
+    assert client.get("/emails/999999").status_code == 404
+
+
+def test_status_and_time_filters_page_with_cursor(api) -> None:
+    from fastapi.testclient import TestClient
+
+    db = api.SessionLocal()
+    try:
+        for i in range(5):
+            db.add(
+                api.EmailORM(
+                    subject=f"Filtered {i}",
+                    body="Can I still drop a class?",
+                    confidence=0.5,
+                    status=api.EmailStatus.review if i % 2 == 0 else api.EmailStatus.sent,
+                    suggested_reply="",
+                    received_at=api.datetime(2031, 3, 1 + i, 9, 0),
+                    assigned_to="Ana" if i < 2 else None,
+                )
+            )
+        db.commit()
+    finally:
+        db.close()
+
+    client = TestClient(api.app)
+    window = {"received_after": "2031-03-01T00:00:00Z", "received_before": "2031-04-01T00:00:00"}
+
+    subjects, cursor = [], None
+    while True:
+        params = {**window, "status": "review", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/emails", params=params)
+        assert all(e["status"] == "review" for e in page.json())
+        subjects += [e["subject"] for e in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert subjects == ["Filtered 4", "Filtered 2", "Filtered 0"]
+
+    # Offsets in the bounds are converted to UTC before comparing
+    late = client.get(
+        "/emails", params={"received_after": "2031-03-04T10:00:00+02:00", "status": "sent"}
+    )
+    assert [e["subject"] for e in late.json()] == ["Filtered 3"]
+
+    assigned = client.get("/emails", params={**window, "assigned_to": "Ana"})
+    assert [e["subject"] for e in assigned.json()] == ["Filtered 1", "Filtered 0"]
+
+    assert client.get("/emails", params={"cursor": "not-a-cursor"}).status_code == 400
@@ -0,0 +1,75 @@
+from pathlib import Path
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from email_advising import PersonalEmailDetector
+
+
+def test_routine_question_is_not_personal() -> None:
+    result = PersonalEmailDetector().check("How do I order my transcript?")
+    assert result.is_personal is False
+    assert result.matched_keywords == []
+    assert result.matched_phrases == []
+
+
+def test_matches_reported_in_list_order() -> None:
+    detector = PersonalEmailDetector(
+        keywords=["grief", "anxiety", "hardship"],
+        phrases=["please help me", "i feel hopeless"],
+    )
+    result = detector.check(
+        "I feel hopeless. Anxiety and grief after a HARDSHIP, please help me."
+    )
+    assert result.is_personal is True
+    assert result.matched_keywords == ["grief", "anxiety", "hardship"]
+    assert result.matched_phrases == ["please help me", "i feel hopeless"]
+
+
+def test_keywords_respect_word_boundaries() -> None:
+    detector = PersonalEmailDetector(keywords=["class", "abuse"], phrases=["help"])
+    result = detector.check("A classification question about unhelpful abuses")
+    assert result.matched_keywords == []
+    assert result.matched_phrases == ["help"]
+
+
+def test_overlapping_terms_are_all_reported() -> None:
+    detector = PersonalEmailDetector(
+        keywords=["hardship", "financial hardship", "financial aid"],
+    )
+    result = detector.check("I am facing financial hardship this term.")
+    assert result.matched_keywords == ["hardship", "financial hardship"]
+
+
+def test_is_personal_agrees_with_check() -> None:
+    detector = PersonalEmailDetector()
+    for text in (
+        "How do I order my transcript?",
+        "I'm struggling and need someone to talk to.",
+        "Question about classification of courses",
+        "My grandmother passed away, it's a family emergency.",
+    ):
+        assert detector.is_personal(text) is detector.check(text).is_personal
+
+
+def test_spelling_variants_match_canonical_phrase() -> None:
+    detector = PersonalEmailDetector()
+    for text in (
+        "Honestly I’m struggling this semester.",
+        "I cannot cope with everything going on.",
+        "i   cant\tcope",
+        "I DON'T feel safe at home",
+    ):
+        assert detector.is_personal(text), text
+
+
+def test_duplicate_variants_reported_once() -> None:
+    detector = PersonalEmailDetector(
+        keywords=["mental health"],
+        phrases=["i'm struggling", "i am struggling"],
+    )
+    result = detector.check("I am struggling with my mental-health.")
+    assert result.matched_keywords == ["mental health"]
+    assert result.matched_phrases == ["i'm struggling"]
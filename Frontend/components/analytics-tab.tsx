@@ -68,10 +68,8 @@ type Email = {
   id: number;
   student_name?: string | null;
   subject: string;
-  body: string;
   confidence: number; // 0–1
   status: EmailStatus;
-  suggested_reply: string;
   received_at: string;
   approved_at?: string | null;
 };
@@ -99,7 +97,7 @@ export default function AnalyticsTab() {
       try {
         setLoading(true);
         setError(null);
-        const res = await fetch(`${BACKEND_URL}/emails`);
+        const res = await fetch(`${BACKEND_URL}/emails?summary=true`);
         if (!res.ok) {
           throw new Error("Failed to fetch emails");
         }
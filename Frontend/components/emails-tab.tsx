@@ -1,6 +1,6 @@
 "use client";
 
-import { useEffect, useState, useCallback } from "react";
+import { useEffect, useState, useCallback, useRef } from "react";
 import { Input } from "@/components/ui/input";
 import ManualReviewTable from "@/components/manual-review-table";
 import AutoSentTable from "@/components/auto-sent-table";
@@ -44,12 +44,58 @@ type Metrics = {
 
 type SyncResult = {
   ingested: number;
-  auto_sent: number;
+  auto_queued?: number;
   last_synced_at: string | null;
+  triggered?: boolean; // /gmail/fetch woke the worker; results arrive as a "sync" event
 };
 
+// Pushed by GET /events
+type EmailEvent =
+  | { op: "insert" | "update"; email: Email; changed?: string[] }
+  | { op: "delete"; id: number };
+
+type MetricsEvent = {
+  deltas: Partial<Record<keyof Metrics, number>>;
+};
+
+type IngestJob = {
+  job_id: number;
+  status: "queued" | "running" | "done" | "failed";
+  email_id?: number | null;
+  error?: string | null;
+};
+
+// One page of GET /emails; nextCursor comes from the X-Next-Cursor header
+type EmailPage = { emails: Email[]; nextCursor: string | null };
+
+// GET /emails/search
+type SearchResults = {
+  results: { email: Email; snippet: string }[];
+  next_cursor: string | null;
+};
+
+const EMAIL_STATUSES: EmailStatus[] = ["review", "auto", "sent", "personal"];
+const EMAILS_PAGE_SIZE = 100;
+const SEARCH_DEBOUNCE_MS = 300; // wait for typing to pause before searching
+
 const DRAFTS_STORAGE_KEY = "emailDrafts";
-const AUTO_SYNC_INTERVAL = 60000; // 60 seconds
+const INGEST_POLL_INTERVAL = 300; // ms between ingest job status checks
+const INGEST_POLL_ATTEMPTS = 40;
+
+/**
+ * Wait for a queued ingest job to finish (or give up after ~12s)
+ */
+async function waitForIngestJob(job: IngestJob): Promise<IngestJob> {
+  let current = job;
+  for (let attempt = 0; attempt < INGEST_POLL_ATTEMPTS; attempt++) {
+    if (current.status === "done" || current.status === "failed") break;
+    await new Promise((resolve) => setTimeout(resolve, INGEST_POLL_INTERVAL));
+    const res = await fetch(`${BACKEND_URL}/emails/ingest/jobs/${current.job_id}`);
+    if (!res.ok) break;
+    current = await res.json();
+  }
+  return current;
+}
 
 // ============================================
 // Date parsing helper - must be defined first
@@ -69,6 +115,10 @@ function parseReceivedAt(received_at: string): Date {
   return new Date(received_at + 'Z');
 }
 
+function isToday(date: Date): boolean {
+  return date.toDateString() === new Date().toDateString();
+}
+
 // Helper to calculate waiting time
 type WaitingTimeInfo = {
   label: string;
@@ -186,12 +236,89 @@ function isReceivedThisYear(received_at: string): boolean {
   return emailDate.getFullYear() === now.getFullYear();
 }
 
+/**
+ * received_at bounds for a time filter, so the backend pages only matching emails.
+ * The client-side filters below still apply to emails pushed over /events.
+ */
+function receivedRange(filter: FilterType): { received_after?: string; received_before?: string } {
+  const now = new Date();
+  const startOfDay = (offsetDays: number) =>
+    new Date(now.getFullYear(), now.getMonth(), now.getDate() + offsetDays);
+
+  switch (filter) {
+    case "today":
+      return { received_after: startOfDay(0).toISOString() };
+    case "yesterday":
+      return { received_after: startOfDay(-1).toISOString(), received_before: startOfDay(0).toISOString() };
+    case "thisWeek":
+      return { received_after: new Date(now.getTime() - 7 * 24 * 60 * 60 * 1000).toISOString() };
+    case "thisMonth":
+      return { received_after: new Date(now.getFullYear(), now.getMonth(), 1).toISOString() };
+    case "thisYear":
+      return { received_after: new Date(now.getFullYear(), 0, 1).toISOString() };
+    default:
+      return {};
+  }
+}
+
+/**
+ * Fetch one newest-first page of emails with the given status
+ */
+async function fetchEmailPage(status: EmailStatus, filter: FilterType, cursor?: string | null): Promise<EmailPage> {
+  const { received_after, received_before } = receivedRange(filter);
+  const params = new URLSearchParams({ status, limit: String(EMAILS_PAGE_SIZE) });
+  if (received_after) params.set("received_after", received_after);
+  if (received_before) params.set("received_before", received_before);
+  if (cursor) params.set("cursor", cursor);
+
+  const res = await fetch(`${BACKEND_URL}/emails?${params}`);
+  if (!res.ok) {
+    throw new Error("Failed to fetch emails from backend");
+  }
+  return { emails: await res.json(), nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+/**
+ * Fetch one best-match-first page of search hits with the given status.
+ * The search runs on the backend, so it also finds emails not loaded yet.
+ */
+async function fetchSearchPage(status: EmailStatus, query: string, cursor?: string | null): Promise<EmailPage> {
+  const params = new URLSearchParams({ q: query, status, limit: String(EMAILS_PAGE_SIZE) });
+  if (cursor) params.set("cursor", cursor);
+
+  const res = await fetch(`${BACKEND_URL}/emails/search?${params}`);
+  if (!res.ok) {
+    throw new Error("Failed to search emails");
+  }
+  const data: SearchResults = await res.json();
+  return { emails: data.results.map((hit) => hit.email), nextCursor: data.next_cursor };
+}
+
+/**
+ * Next page of one status: search hits while there is a query, otherwise the plain list
+ */
+function fetchPage(status: EmailStatus, filter: FilterType, query: string, cursor?: string | null): Promise<EmailPage> {
+  return query ? fetchSearchPage(status, query, cursor) : fetchEmailPage(status, filter, cursor);
+}
+
 export default function EmailsTab() {
   const [searchTerm, setSearchTerm] = useState("");
+  // searchTerm once typing pauses; non-empty means the lists hold search hits
+  const [searchQuery, setSearchQuery] = useState("");
+  const searchQueryRef = useRef(searchQuery);
+  searchQueryRef.current = searchQuery;
+  // Bumped by every full reload so a slow, superseded response is dropped
+  const loadGenerationRef = useRef(0);
   const [activeFilter, setActiveFilter] = useState<FilterType>("all");
+  // Read by fetches started from the long-lived /events listeners
+  const activeFilterRef = useRef<FilterType>(activeFilter);
+  activeFilterRef.current = activeFilter;
   const [activeSection, setActiveSection] = useState<"review" | "pending" | "sent" | "personal">("review");
 
   const [emails, setEmails] = useState<Email[]>([]);
+  // Cursor for the next page of each status; null once it is fully loaded
+  const [nextCursors, setNextCursors] = useState<Partial<Record<EmailStatus, string | null>>>({});
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
   const [reviewEmails, setReviewEmails] = useState<Email[]>([]);
   const [pendingEmails, setPendingEmails] = useState<Email[]>([]);
   const [sentEmails, setSentEmails] = useState<Email[]>([]);
@@ -299,20 +426,24 @@ export default function EmailsTab() {
     }
   }
 
-  // --- Fetch emails from backend ---
+  // --- Fetch the first page of every status (or of search hits) from backend ---
   async function fetchEmails() {
+    const generation = ++loadGenerationRef.current;
     try {
       setLoading(true);
       setError(null);
 
-      // Fetch all emails
-      const res = await fetch(`${BACKEND_URL}/emails`);
-      if (!res.ok) {
-        throw new Error("Failed to fetch emails from backend");
-      }
-
-      const allEmails: Email[] = await res.json();
+      const pages = await Promise.all(
+        EMAIL_STATUSES.map((status) => fetchPage(status, activeFilterRef.current, searchQueryRef.current))
+      );
+      if (generation !== loadGenerationRef.current) return;
+      const allEmails = pages.flatMap((page) => page.emails);
       setEmails(allEmails);
+      const cursors: Partial<Record<EmailStatus, string | null>> = {};
+      EMAIL_STATUSES.forEach((status, i) => {
+        cursors[status] = pages[i].nextCursor;
+      });
+      setNextCursors(cursors);
 
       // Seed assignedPersons from backend data
       const fromBackend: Record<number, string> = {};
@@ -321,10 +452,41 @@ export default function EmailsTab() {
       }
       setAssignedPersons(fromBackend);
     } catch (err) {
+      if (generation !== loadGenerationRef.current) return;
       console.error(err);
       setError("Could not load emails from backend");
     } finally {
-      setLoading(false);
+      if (generation === loadGenerationRef.current) setLoading(false);
+    }
+  }
+
+  // --- Append the next page of one status ---
+  async function loadMoreEmails(status: EmailStatus) {
+    const cursor = nextCursors[status];
+    if (!cursor) return;
+
+    const generation = loadGenerationRef.current;
+    try {
+      setLoadingMore(true);
+      const page = await fetchPage(status, activeFilterRef.current, searchQueryRef.current, cursor);
+      if (generation !== loadGenerationRef.current) return;
+      setEmails((prev) => {
+        const loaded = new Set(prev.map((email) => email.id));
+        return [...prev, ...page.emails.filter((email) => !loaded.has(email.id))];
+      });
+      setAssignedPersons((prev) => {
+        const next = { ...prev };
+        for (const e of page.emails) {
+          if (e.assigned_to) next[e.id] = e.assigned_to;
+        }
+        return next;
+      });
+      setNextCursors((prev) => ({ ...prev, [status]: page.nextCursor }));
+    } catch (err) {
+      console.error(err);
+      showToast("Could not load more emails", "error");
+    } finally {
+      setLoadingMore(false);
     }
   }
 
@@ -361,6 +523,11 @@ export default function EmailsTab() {
       }
 
       const data: SyncResult = await res.json();
+      if (data.triggered) {
+        // New emails are pushed over /events once the worker has synced
+        showToast("Checking Gmail for new emails…", "success");
+        return;
+      }
       setLastSyncedAt(data.last_synced_at ?? new Date().toISOString());
 
       await Promise.all([fetchEmails(), fetchMetrics()]);
@@ -396,11 +563,16 @@ export default function EmailsTab() {
         received_at: new Date().toISOString(),
       };
 
-      await fetch(`${BACKEND_URL}/emails/ingest`, {
+      const res = await fetch(`${BACKEND_URL}/emails/ingest`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify(sampleEmail),
       });
+      if (!res.ok) throw new Error("Failed to queue sample email");
+
+      // Ingest is queued; wait for the workers before refreshing
+      const job = await waitForIngestJob(await res.json());
+      if (job.status === "failed") throw new Error(job.error || "Ingest failed");
 
       await Promise.all([fetchEmails(), fetchMetrics()]);
       showToast("Sample email created", "success");
@@ -646,34 +818,77 @@ export default function EmailsTab() {
 
   // --- Initial load ---
   useEffect(() => {
-    fetchEmails();
     fetchMetrics();
     fetchGmailStatus();
   }, []);
 
-  // --- Auto-sync polling (every 60 seconds if Gmail is connected) ---
+  // --- Search on the backend once typing pauses ---
+  useEffect(() => {
+    const timer = setTimeout(() => setSearchQuery(searchTerm.trim()), SEARCH_DEBOUNCE_MS);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
+
+  // --- (Re)load the first pages whenever the time filter or search changes ---
   useEffect(() => {
-    if (!gmailConnected) return;
-
-    const interval = setInterval(() => {
-      // Silent sync - don't show loading indicator for auto-sync
-      fetch(`${BACKEND_URL}/gmail/fetch`)
-        .then((res) => res.json())
-        .then((data: SyncResult) => {
-          if (data.ingested > 0) {
-            fetchEmails();
-            fetchMetrics();
-            showToast(`${data.ingested} new email(s) received`, "success");
-          }
-          if (data.last_synced_at) {
-            setLastSyncedAt(data.last_synced_at);
-          }
-        })
-        .catch(console.error);
-    }, AUTO_SYNC_INTERVAL);
-
-    return () => clearInterval(interval);
-  }, [gmailConnected, showToast]);
+    fetchEmails();
+  }, [activeFilter, searchQuery]);
+
+  // --- Live updates: the backend syncs Gmail itself and pushes changes ---
+  useEffect(() => {
+    const source = new EventSource(`${BACKEND_URL}/events`);
+
+    source.addEventListener("email", (e) => {
+      const change: EmailEvent = JSON.parse((e as MessageEvent).data);
+      if (change.op === "delete") {
+        setEmails((prev) => prev.filter((email) => email.id !== change.id));
+        return;
+      }
+      const updated = change.email;
+      setEmails((prev) => {
+        const index = prev.findIndex((email) => email.id === updated.id);
+        // While searching, the lists hold only hits: don't add unmatched new emails
+        if (index === -1) return searchQueryRef.current ? prev : [updated, ...prev];
+        const next = [...prev];
+        next[index] = updated;
+        return next;
+      });
+      setAssignedPersons((prev) => {
+        const next = { ...prev };
+        if (updated.assigned_to) next[updated.id] = updated.assigned_to;
+        else delete next[updated.id];
+        return next;
+      });
+      if (change.op === "insert" && isToday(parseReceivedAt(updated.received_at))) {
+        setMetrics((prev) => prev && { ...prev, emails_today: prev.emails_today + 1 });
+      }
+    });
+
+    source.addEventListener("metrics", (e) => {
+      const { deltas }: MetricsEvent = JSON.parse((e as MessageEvent).data);
+      setMetrics((prev) => {
+        if (!prev) return prev;
+        const next = { ...prev };
+        for (const key of ["emails_total", "auto_count", "review_count", "sent_count"] as const) {
+          next[key] = (next[key] ?? 0) + (deltas[key] ?? 0);
+        }
+        return next;
+      });
+    });
+
+    source.addEventListener("sync", (e) => {
+      const data: SyncResult = JSON.parse((e as MessageEvent).data);
+      if (data.last_synced_at) setLastSyncedAt(data.last_synced_at);
+      if (data.ingested > 0) showToast(`${data.ingested} new email(s) received`, "success");
+    });
+
+    // Events were missed (tab fell behind or reconnected too late): reload
+    source.addEventListener("resync", () => {
+      fetchEmails();
+      fetchMetrics();
+    });
+
+    return () => source.close();
+  }, [showToast]);
 
   // --- Categorize emails anytime backend list changes ---
   useEffect(() => {
@@ -725,17 +940,7 @@ export default function EmailsTab() {
       filtered = filtered.filter((e) => isReceivedThisYear(e.received_at));
     }
 
-    // Text search: student name, UNI, subject
-    if (searchTerm.trim().length > 0) {
-      const q = searchTerm.toLowerCase();
-      filtered = filtered.filter((e) => {
-        return (
-          (e.student_name ?? "").toLowerCase().includes(q) ||
-          (e.uni ?? "").toLowerCase().includes(q) ||
-          e.subject.toLowerCase().includes(q)
-        );
-      });
-    }
+    // Text search runs on the backend (fetchSearchPage): the lists already hold only hits
 
     // Advisor filter: show only emails assigned to the selected advisor
     if (advisorFilter !== null) {
@@ -753,9 +958,24 @@ export default function EmailsTab() {
   const filteredSentEmails = filterEmails(sentEmails);
   const filteredPersonalEmails = filterEmails(personalEmails);
 
-  // Calculate the CORRECT emails today count from all emails
-  const allEmails = emails;
-  const correctEmailsTodayCount = allEmails.filter((e) => isReceivedToday(e.received_at)).length;
+  // Only the loaded pages are in memory, so the strip reads its counts from /metrics
+  const personalCount = metrics
+    ? metrics.emails_total - metrics.auto_count - metrics.review_count - (metrics.sent_count ?? 0)
+    : personalEmails.length;
+
+  // "Load more" for the status behind the active section
+  const activeSectionStatus: EmailStatus = activeSection === "pending" ? "auto" : activeSection;
+  const loadMoreButton = nextCursors[activeSectionStatus] ? (
+    <div className="flex justify-center">
+      <button
+        onClick={() => loadMoreEmails(activeSectionStatus)}
+        disabled={loadingMore}
+        className="px-4 py-2 rounded-md text-sm font-medium bg-gray-100 text-foreground hover:bg-gray-200 disabled:opacity-60"
+      >
+        {loadingMore ? "Loading..." : "Load more"}
+      </button>
+    </div>
+  ) : null;
 
   // Count selected in current view
   const selectedInView =
@@ -868,28 +1088,28 @@ export default function EmailsTab() {
           </p>
         </div>
 
-        {/* Metrics strip - use correctEmailsTodayCount instead of backend value */}
+        {/* Metrics strip - counts cover every email, not just the loaded pages */}
         {metrics && (
           <div className="grid grid-cols-2 md:grid-cols-5 gap-3">
             <div className="rounded-lg border border-border p-3">
               <p className="text-xs text-muted-foreground">Emails Today</p>
-              <p className="text-xl font-semibold text-foreground">{correctEmailsTodayCount}</p>
+              <p className="text-xl font-semibold text-foreground">{metrics.emails_today}</p>
             </div>
             <div className="rounded-lg border border-border p-3">
               <p className="text-xs text-muted-foreground">Needs Review</p>
-              <p className="text-xl font-semibold text-foreground">{reviewEmails.length}</p>
+              <p className="text-xl font-semibold text-foreground">{metrics.review_count}</p>
             </div>
             <div className="rounded-lg border border-border p-3">
               <p className="text-xs text-muted-foreground">Pending Send</p>
-              <p className="text-xl font-semibold text-foreground">{pendingEmails.length}</p>
+              <p className="text-xl font-semibold text-foreground">{metrics.auto_count}</p>
             </div>
             <div className="rounded-lg border border-border p-3">
               <p className="text-xs text-muted-foreground">Sent</p>
-              <p className="text-xl font-semibold text-foreground">{sentEmails.length}</p>
+              <p className="text-xl font-semibold text-foreground">{metrics.sent_count ?? sentEmails.length}</p>
             </div>
             <div className="rounded-lg border border-red-200 bg-red-50 p-3">
               <p className="text-xs text-red-600">Personal</p>
-              <p className="text-xl font-semibold text-red-700">{personalEmails.length}</p>
+              <p className="text-xl font-semibold text-red-700">{personalCount}</p>
             </div>
           </div>
         )}
@@ -1064,7 +1284,7 @@ export default function EmailsTab() {
             {/* Search bar + Select All for Needs Review */}
             <div className="flex items-center gap-3">
               <Input
-                placeholder="Search by student name, UNI, or subject..."
+                placeholder="Search by student name, subject, or message..."
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="max-w-md"
@@ -1099,6 +1319,7 @@ export default function EmailsTab() {
               assignedPersons={assignedPersons}
               onAssignPerson={handleAssignPerson}
             />
+            {loadMoreButton}
           </div>
         )}
 
@@ -1107,7 +1328,7 @@ export default function EmailsTab() {
             {/* Search bar + Select All for Pending Send */}
             <div className="flex items-center gap-3">
               <Input
-                placeholder="Search by student name, UNI, or subject..."
+                placeholder="Search by student name, subject, or message..."
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="max-w-md"
@@ -1145,6 +1366,7 @@ export default function EmailsTab() {
               assignedPersons={assignedPersons}
               onAssignPerson={handleAssignPerson}
             />
+            {loadMoreButton}
           </div>
         )}
 
@@ -1182,6 +1404,7 @@ export default function EmailsTab() {
               assignedPersons={assignedPersons}
               onAssignPerson={handleAssignPerson}
             />
+            {loadMoreButton}
           </div>
         )}
 
@@ -1190,7 +1413,7 @@ export default function EmailsTab() {
             {/* Search bar + Select All for Sent */}
             <div className="flex items-center gap-3">
               <Input
-                placeholder="Search by student name, UNI, or subject..."
+                placeholder="Search by student name, subject, or message..."
                 value={searchTerm}
                 onChange={(e) => setSearchTerm(e.target.value)}
                 className="max-w-md"
@@ -1225,6 +1448,7 @@ export default function EmailsTab() {
               assignedPersons={assignedPersons}
               onAssignPerson={handleAssignPerson}
             />
+            {loadMoreButton}
           </div>
         )}
       </div>
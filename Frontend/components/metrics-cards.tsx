@@ -36,10 +36,8 @@ type Email = {
   id: number;
   student_name?: string | null;
   subject: string;
-  body: string;
   confidence: number;
   status: EmailStatus;
-  suggested_reply: string;
   received_at: string;
   approved_at?: string | null;
 };
@@ -114,7 +112,7 @@ export default function MetricsCards() {
 
       const [metricsRes, emailsRes] = await Promise.all([
         fetch(`${BACKEND_URL}/metrics`),
-        fetch(`${BACKEND_URL}/emails`),
+        fetch(`${BACKEND_URL}/emails?summary=true`),
       ]);
 
       if (!metricsRes.ok || !emailsRes.ok) {